@@ -6,37 +6,17 @@ It is used in GraphManger to see what the book thickness of a graph is, and give
 embedding once it finds it.
 """
 
-import copy
+from SurfaceGraph import SurfaceGraph
 
-class BookEmbedding():
+class BookEmbedding(SurfaceGraph):
 
     def __init__(self, perm, edgeSet, numPages=1):
-        self.verts = len(perm)
         self.spine = perm
-        self.addedEdges = []
-        self.remainingEdges = edgeSet
-        self.availableEdges = []
         self.numPages = numPages
-        self.generate_all_possible_edges()
+        super().__init__(perm, edgeSet, list(range(1, numPages + 1)))
 
-    def is_possible_to_embedd(self):
-        possible = True
-        for edge in self.remainingEdges:
-            edge_avail = False
-            for page_number in range(1, self.numPages + 1):
-                if self.is_edge_available((edge, page_number)):
-                    edge_avail = True
-                    break
-            if edge_avail == False:
-                possible = False
-                break
-        return possible
-
-    def is_graph_placed(self):
-        if len(self.remainingEdges) == 0:
-            return True
-        else:
-            return False
+    def new_position_graph(self):
+        return BookEmbedding(list(range(1, self.verts + 1)), [], self.numPages)
 
     def __str__(self):
         pretty_print = "Book Embedding of Graph\n"
@@ -62,9 +42,7 @@ class BookEmbedding():
                 j = temp
 
             if (i, j) in self.remainingEdges:
-                self.addedEdges.append(((i, j), 1))
-                self.remainingEdges.remove((i, j))
-                self.remove_edge_from_available((i, j))
+                self.add_placed_edge(((i, j), 1), free=True)
 
         i = self.spine[0]
         j = self.spine[-1]
@@ -73,41 +51,7 @@ class BookEmbedding():
             i = j
             j = temp
         if (i, j) in self.remainingEdges:
-            self.addedEdges.append(((i, j), 1))
-            self.remainingEdges.remove((i, j))
-            self.remove_edge_from_available((i,j))
-
-    def generate_all_possible_edges(self):
-        for pageNumber in range(1, self.numPages + 1):
-            for vert in range(1, self.verts):
-                for other in range(vert + 1, self.verts + 1): 
-                    self.availableEdges.append(((vert, other), pageNumber))
-
-    def remove_edge_from_available(self, removed_edge):
-        new_edge_copy = self.availableEdges.copy()
-        for edge in self.availableEdges:
-            if edge[0] == removed_edge:
-                new_edge_copy.remove(edge)
-        self.availableEdges = new_edge_copy
-
-    def remove_typed_edge(self, remove_edge):
-        new_edge_copy = self.availableEdges.copy()
-        removed_edge = remove_edge[0]
-        edge_type = remove_edge[1]
-
-        if removed_edge[0] > removed_edge[1]:
-            print("WARNING: First vertex given larger than second")
-
-        for edge in self.availableEdges:
-            if edge[0] == removed_edge and edge[1] == edge_type:
-                new_edge_copy.remove(edge)
-        self.availableEdges = new_edge_copy
-
-    def is_edge_available(self, edge):
-        for avail_edge in self.availableEdges:
-            if edge[0] == avail_edge[0] and edge[1] == avail_edge[1]:
-                return True
-        return False
+            self.add_placed_edge(((i, j), 1), free=True)
 
     def place_edge(self, a, b, page_number):
         if page_number not in list(range(1, self.numPages + 1)):
@@ -118,12 +62,7 @@ class BookEmbedding():
             print("edge is not available")
             return -1
 
-        self.addedEdges.append(edge)
-        if edge[0] in self.remainingEdges:
-            self.remainingEdges.remove(edge[0])
-        self.remove_edge_from_available(edge[0])
-
-        self.add_blocked_edges(edge)
+        self.add_placed_edge(edge)
 
     def add_blocked_edges(self, placed_edge):
         edge = placed_edge[0]
@@ -152,18 +91,3 @@ class BookEmbedding():
                     self.remove_typed_edge(((vert, block), page_number))
                 else:
                     self.remove_typed_edge(((block, vert), page_number))
-
-    def get_available_edges(self, edge):
-        edges = []
-        for avail_edge in self.availableEdges:
-            if avail_edge[0] == edge:
-                edges.append(avail_edge)
-        return edges
-
-    def copy(self):
-        graph2 = copy.deepcopy(self)
-        return graph2
-
-            
-
-    
\ No newline at end of file
@@ -6,7 +6,16 @@ one-page book embedding. You can either search all permutations for an
 embedding, or only search a few.
 """
 
+import os
 import sys
+import json
+import hashlib
+import time
+import queue
+import pickle
+import inspect
+import weakref
+import tempfile
 import itertools
 from MobiusGraph import MobiusGraph
 from BookEmbedding import BookEmbedding
@@ -14,125 +23,1295 @@ from KleinGraph import KleinGraph
 from KleinGraphB import KleinGraphB
 from TorusGraph import TorusGraph
 import Permutations
+import SurfaceGraph
+import ResultCache
 
-from multiprocessing import Pool, cpu_count
-from functools import partial
+from multiprocessing import Pool, Event, cpu_count
+from functools import partial, wraps
 
-def find_mobius_embedding_with_permutation(perm, edgeSet):
-    edgeSet = edgeSet.copy()
-    genA = MobiusGraph(perm, edgeSet)
-    genA.place_free_edges()
-    graphs = [genA]
+surface_classes = {"book": BookEmbedding, "mobius": MobiusGraph, "torus": TorusGraph,
+                   "klein": KleinGraph, "klein_b": KleinGraphB}
 
-    while len(graphs) > 0:
-        new_graphs = []
-        for graph in graphs:
-            if graph.is_graph_placed():
-                return graph
-            if not graph.is_possible_to_embedd():
+def get_max_edges(surface, numVertices, numberPages=1):
+    """Upper bound on the edges of a graph with numVertices vertices that
+    embeds in the given book. A page of a book of half-planes holds an
+    outerplanar graph, so k pages hold at most (k + 1)n - 3k edges. A Mobius
+    page embeds in the projective plane, and torus and Klein pages in
+    surfaces of Euler characteristic 0, which give 3n - 3 and 3n by Euler's
+    formula.
+    """
+    most = numVertices * (numVertices - 1) // 2
+    if numVertices < 3:
+        return most
+    if surface == "book":
+        bound = (numberPages + 1) * numVertices - 3 * numberPages
+    elif surface == "mobius":
+        bound = 3 * numVertices - 3
+    elif surface in ["torus", "klein", "klein_b"]:
+        bound = 3 * numVertices
+    else:
+        print("invalid surface")
+        sys.exit()
+    return min(most, bound)
+
+def exceeds_edge_bound(edgeSet, surface, numberPages=1):
+    """Checks edgeSet and its subgraphs left by removing a vertex of smallest
+    degree, one at a time, against get_max_edges. Every subgraph of an
+    embeddable graph embeds too, so True means edgeSet cannot embed.
+
+    The sweeps check it once up front. It is not checked again while placing
+    edges on a fixed spine: the placed and remaining edges always add up to
+    edgeSet, so remaining edges against remaining capacity rejects nothing
+    more.
+    """
+    adjacency = {}
+    for edge in edgeSet:
+        adjacency.setdefault(edge[0], set()).add(edge[1])
+        adjacency.setdefault(edge[1], set()).add(edge[0])
+    num_edges = sum(len(neighbours) for neighbours in adjacency.values()) // 2
+
+    while len(adjacency) > 0:
+        if num_edges > get_max_edges(surface, len(adjacency), numberPages):
+            return True
+        vert = min(adjacency, key=lambda vert: len(adjacency[vert]))
+        for other in adjacency[vert]:
+            adjacency[other].discard(vert)
+        num_edges -= len(adjacency.pop(vert))
+    return False
+
+# set in every worker of a search pool
+cancel_event = None
+
+# the number of workers and the cancel event of every pool made by
+# create_search_pool
+search_pools = weakref.WeakKeyDictionary()
+
+def set_cancel_event(event):
+    """Pool initializer that hands each worker the cancel event of its pool."""
+    global cancel_event
+    cancel_event = event
+
+def is_search_cancelled():
+    return cancel_event != None and cancel_event.is_set()
+
+def create_search_pool(processes=None):
+    """Creates a pool for the pooled sweeps, which can be passed to any number
+    of them. Its workers share one cancel event, which the searches poll so
+    that every worker stops once an embedding is found.
+    """
+    if processes == None:
+        processes = max(1, cpu_count() - 2)
+    event = Event()
+    pool = Pool(processes, initializer=set_cancel_event, initargs=(event,))
+    search_pools[pool] = (processes, event)
+    return pool
+
+def get_search_pool(pool):
+    """Returns the number of workers and the cancel event of a pool made by
+    create_search_pool.
+    """
+    if pool not in search_pools:
+        print("Pooled searches need a pool made by create_search_pool.")
+        sys.exit()
+    return search_pools[pool]
+
+# seconds between the writes of a sweep's checkpoint
+CHECKPOINT_SECONDS = 30
+
+def get_progress_message(counter, num_perms):
+    if num_perms == None:
+        return "Graphs Completed: " + str(counter)
+    return "Graphs Completed: " + str(counter) + " / " + str(num_perms)
+
+def get_checkpoint_key(surface, edgeSet, perms, numberPages=None):
+    """Key of a sweep in the checkpoint file. Generated spine orderings are
+    told apart by their size and generators, and a plain list of them by a
+    hash of its orderings, so that two lists of the same length never share
+    the progress of one sweep.
+    """
+    if isinstance(perms, Permutations.OrbitPerms):
+        size = [perms.num_elements, [[generator[vert] for vert in sorted(generator)] for generator in perms.generators]]
+    elif isinstance(perms, Permutations.DihedralPerms):
+        size = len(perms)
+    else:
+        orderings = json.dumps([list(perm) for perm in perms])
+        size = [len(perms), hashlib.sha1(orderings.encode()).hexdigest()]
+    return json.dumps([surface, numberPages, [list(edge) for edge in edgeSet], type(perms).__name__, size])
+
+def load_checkpoint(checkpoint, key, resume=False):
+    """Returns the progress of the sweep key in the checkpoint file: the
+    positions in the spine orderings searched with nothing found, as sorted
+    [start, end) ranges, and the spine and packed edge types of an embedding
+    found, or None. Without resume the sweep starts over. One file can hold
+    many sweeps, such as the kernel and the whole graph searched by
+    find_embedding_by_reduction, or the page counts of a book sweep.
+    """
+    state = {"path": checkpoint, "key": key, "done": [], "found": None, "saved": time.time()}
+    if resume and os.path.exists(checkpoint):
+        with open(checkpoint) as infile:
+            saved = json.load(infile).get(key)
+        if saved != None:
+            state["done"] = saved["done"]
+            state["found"] = saved["found"]
+    return state
+
+def save_checkpoint(state):
+    """Writes the progress in state to its checkpoint file, keeping the other
+    sweeps saved there. The file is replaced in one step, so a sweep killed
+    while writing leaves the last checkpoint whole.
+    """
+    sweeps = {}
+    if os.path.exists(state["path"]):
+        with open(state["path"]) as infile:
+            sweeps = json.load(infile)
+    sweeps[state["key"]] = {"done": state["done"], "found": state["found"]}
+    temp_path = state["path"] + ".tmp"
+    with open(temp_path, "w") as outfile:
+        json.dump(sweeps, outfile)
+        outfile.flush()
+        os.fsync(outfile.fileno())
+    os.replace(temp_path, state["path"])
+    state["saved"] = time.time()
+
+def mark_finished(state, positions):
+    """Adds the spine positions searched with nothing found to state, and
+    saves it when the last save is CHECKPOINT_SECONDS old.
+    """
+    spans = state["done"] + [[position, position + 1] for position in positions]
+    done = []
+    for span in sorted(spans):
+        if len(done) > 0 and span[0] <= done[-1][1]:
+            done[-1][1] = max(done[-1][1], span[1])
+        else:
+            done.append(span)
+    state["done"] = done
+    if time.time() - state["saved"] >= CHECKPOINT_SECONDS:
+        save_checkpoint(state)
+
+def count_finished(state):
+    if state == None:
+        return 0
+    return sum(span[1] - span[0] for span in state["done"])
+
+def generate_unfinished(tasks, state):
+    """Yields the position and task of every task not marked finished in the
+    checkpoint state, which may be None.
+    """
+    done = state["done"] if state != None else []
+    span = 0
+    for position, task in enumerate(tasks):
+        while span < len(done) and done[span][1] <= position:
+            span += 1
+        if span < len(done) and done[span][0] <= position:
+            continue
+        yield position, task
+
+def record_found(state, perm, codes):
+    state["found"] = {"perm": list(perm), "codes": codes.hex()}
+    save_checkpoint(state)
+
+def get_found(state):
+    return state["found"]["perm"], bytes.fromhex(state["found"]["codes"])
+
+# seconds of search each chunk of pooled tasks is sized to take
+CHUNK_SECONDS = 0.05
+
+def run_task_chunk(find_with_task, chunk, first_only=True):
+    """Runs find_with_task on the tasks of chunk in a pool worker, with
+    first_only until one gives a result other than -1. Returns the results
+    other than -1, the number of tasks run and the seconds they took.
+    """
+    start = time.perf_counter()
+    results = []
+    count = 0
+    for task in chunk:
+        if is_search_cancelled():
+            break
+        result = find_with_task(task)
+        count += 1
+        if result != -1:
+            results.append(result)
+            if first_only:
+                break
+    return results, count, time.perf_counter() - start
+
+def run_pooled_search(find_with_task, tasks, num_tasks, pool=None, checkpoint_state=None, on_result=None):
+    """Runs find_with_task on every task on a search pool, printing progress,
+    and returns the first result other than -1 that it gives, or -1. With
+    on_result, every result other than -1 is passed to it in this process
+    instead, and the search stops once it returns True. num_tasks is None
+    when the number of tasks is not known beforehand.
+
+    Tasks are handed out in chunks, with at most two chunks per worker at a
+    time. Chunk sizes follow the measured time per task, so each chunk takes
+    about CHUNK_SECONDS, but a chunk is never more than a share of the tasks
+    left, when their number is known, so that workers finish together. Once
+    the search stops the cancel event is set: no more chunks are handed out,
+    and the ones already handed out stop at their next poll. They are waited
+    for before the event is cleared, so the pool is idle again when this
+    returns. A pool made by create_search_pool can be given, otherwise one
+    is made for this search.
+
+    With a checkpoint_state from load_checkpoint, tasks already finished are
+    skipped and the chunks that finish with nothing found are marked in it.
+    It is only kept for searches without on_result.
+    """
+    own_pool = pool == None
+    if own_pool:
+        pool = create_search_pool()
+    processes, pool_cancel_event = get_search_pool(pool)
+    pool_cancel_event.clear()
+    max_in_flight = 2 * processes
+
+    counter = count_finished(checkpoint_state)
+    backspaces = ""
+    progress_message = backspaces + get_progress_message(counter, num_tasks)
+    print(progress_message, end="", flush=True)
+    backspaces = len(progress_message) * "\b"
+
+    final_result = -1
+    finished = queue.Queue()
+    task_iter = generate_unfinished(tasks, checkpoint_state)
+    handed_out = counter
+    in_flight = 0
+    chunk_size = 1
+    tasks_left = True
+    try:
+        while True:
+            while tasks_left and in_flight < max_in_flight and not pool_cancel_event.is_set():
+                size = chunk_size
+                if num_tasks != None:
+                    size = min(chunk_size, max(1, (num_tasks - handed_out) // max_in_flight))
+                chunk = list(itertools.islice(task_iter, size))
+                if len(chunk) == 0:
+                    tasks_left = False
+                    break
+                positions = [position for position, task in chunk]
+                put_result = lambda result, positions=positions: finished.put((positions, result))
+                chunk_tasks = [task for position, task in chunk]
+                pool.apply_async(run_task_chunk, (find_with_task, chunk_tasks, on_result == None),
+                                 callback=put_result, error_callback=put_result)
+                handed_out += len(chunk)
+                in_flight += 1
+            if in_flight == 0:
+                break
+
+            positions, result = finished.get()
+            in_flight -= 1
+            if isinstance(result, BaseException):
+                raise result
+            results, count, seconds = result
+            # chunks finishing after the search stops may have been cancelled,
+            # and the task that gave a result is the last one a chunk ran
+            if checkpoint_state != None and not pool_cancel_event.is_set():
+                mark_finished(checkpoint_state, positions[:count - len(results)])
+            counter += count
+            progress_message = backspaces + get_progress_message(counter, num_tasks)
+            print(progress_message, end="", flush=True)
+            backspaces = len(progress_message) * "\b"
+
+            for task_result in results:
+                if pool_cancel_event.is_set():
+                    break
+                if on_result == None:
+                    final_result = task_result
+                    pool_cancel_event.set()
+                elif on_result(task_result):
+                    pool_cancel_event.set()
+            if count > 0 and seconds > 0:
+                chunk_size = max(1, min(4 * chunk_size, int(CHUNK_SECONDS * count / seconds)))
+    finally:
+        pool_cancel_event.clear()
+        if own_pool:
+            pool.terminate()
+        if checkpoint_state != None:
+            save_checkpoint(checkpoint_state)
+    print()
+    return final_result
+
+# the job of the last pooled search task run in this process
+worker_job = None
+worker_job_path = None
+
+def write_pool_job(find_with_perm, perms, surface, edgeSet):
+    """Writes what every task of a pooled sweep shares to a temporary file:
+    the search to run on each spine, the spine orderings when they are a
+    plain list, and the compiled blocking table of the surface. Tasks then
+    only carry a spine rank, and each worker reads the file once. Returns
+    the job, the file path and the tasks. find_with_perm is given the edges
+    of the job as edgeSet.
+    """
+    job = {"find_with_perm": find_with_perm, "perms": None, "num_elements": None, "tables": {},
+           "surface": surface, "edgeSet": edgeSet}
+    if isinstance(perms, Permutations.OrbitPerms):
+        job["num_elements"] = perms.num_elements
+        tasks = perms.generate_ranks()
+    elif isinstance(perms, Permutations.DihedralPerms):
+        job["num_elements"] = perms.num_elements
+        tasks = (Permutations.rank_dihedral_perm(perm) for perm in perms)
+    else:
+        job["perms"] = list(perms)
+        tasks = range(len(job["perms"]))
+
+    num_verts = job["num_elements"]
+    if job["perms"] != None and len(job["perms"]) > 0:
+        num_verts = len(job["perms"][0])
+    if num_verts != None:
+        graph = surface_classes[surface](list(range(1, num_verts + 1)), [])
+        key = (type(graph), graph.verts, tuple(graph.edge_types))
+        job["tables"][key] = SurfaceGraph.get_blocking_table(graph)
+
+    job_file, job_path = tempfile.mkstemp(suffix=".job")
+    with os.fdopen(job_file, "wb") as outfile:
+        pickle.dump(job, outfile)
+    return job, job_path, tasks
+
+def load_pool_job(job_path):
+    global worker_job, worker_job_path
+    if job_path != worker_job_path:
+        with open(job_path, "rb") as infile:
+            worker_job = pickle.load(infile)
+        worker_job_path = job_path
+        SurfaceGraph.blocking_table_cache.update(worker_job["tables"])
+    return worker_job
+
+def get_job_perm(job, rank):
+    if job["perms"] != None:
+        return job["perms"][rank]
+    return Permutations.unrank_dihedral_perm(rank, job["num_elements"])
+
+def pack_embedding(graph, edgeSet):
+    """Packs the edge types of an embedding into one byte per edge, in the
+    order of edgeSet.
+    """
+    edge_types = dict(graph.addedEdges)
+    return bytes(graph.type_index[edge_types[edge]] for edge in edgeSet)
+
+def get_spine(graph):
+    if isinstance(graph, BookEmbedding):
+        return graph.spine
+    return graph.top_spine
+
+def pack_result(graph, edgeSet, rebuild=True):
+    """Returns the result of a sweep as run_pooled_sweep gives it: graph, or
+    with rebuild=False its spine and packed edge types.
+    """
+    if graph == -1 or rebuild:
+        return graph
+    return get_spine(graph), pack_embedding(graph, edgeSet)
+
+def unpack_embedding(surface, perm, edgeSet, codes, *args):
+    """Rebuilds an embedding packed by pack_embedding by placing its edges
+    again on the spine perm. args are passed on to the surface class, such
+    as the number of pages of a book.
+    """
+    graph = surface_classes[surface](perm, edgeSet.copy(), *args)
+    graph.place_free_edges()
+    for i in range(len(edgeSet)):
+        if edgeSet[i] in graph.remainingEdges:
+            graph.place_edge(edgeSet[i][0], edgeSet[i][1], graph.edge_types[codes[i]])
+    return graph
+
+def run_pool_task(job_path, rank):
+    """Searches the spine of the given rank in a pool worker, on a copy of
+    the edges of the job as searches place edges from the list they are
+    given. An embedding is sent back as its rank and packed edge types, and
+    a failure as -1.
+    """
+    job = load_pool_job(job_path)
+    graph = job["find_with_perm"](get_job_perm(job, rank), edgeSet=job["edgeSet"].copy())
+    if graph == -1:
+        return -1
+    return rank, pack_embedding(graph, job["edgeSet"])
+
+def run_pooled_sweep(find_with_perm, perms, surface, edgeSet, pool=None, rebuild=True, checkpoint=None, resume=False):
+    """Runs find_with_perm on every spine of perms on a search pool, with the
+    job shipped once through write_pool_job. The embedding found is rebuilt
+    from its packed edge types, or with rebuild=False returned as its spine
+    and packed edge types for unpack_embedding. Progress is saved to the
+    checkpoint file when one is given, and with resume picked up from it.
+    """
+    state = None
+    if checkpoint != None:
+        state = load_checkpoint(checkpoint, get_checkpoint_key(surface, edgeSet, perms), resume)
+    if state != None and state["found"] != None:
+        perm, codes = get_found(state)
+    else:
+        job, job_path, tasks = write_pool_job(find_with_perm, perms, surface, edgeSet)
+        try:
+            found = run_pooled_search(partial(run_pool_task, job_path), tasks, len(perms), pool, state)
+        finally:
+            os.remove(job_path)
+        if found == -1:
+            return -1
+        perm, codes = get_job_perm(job, found[0]), found[1]
+        if state != None:
+            record_found(state, perm, codes)
+    if not rebuild:
+        return perm, codes
+    return unpack_embedding(surface, perm, edgeSet, codes)
+
+def run_sweep(find_with_permutation, perms, surface, edgeSet, checkpoint=None, resume=False, **options):
+    """Runs find_with_permutation on every spine of perms in this process,
+    printing progress, and returns the first graph found, or -1. options are
+    passed on to find_with_permutation, such as the number of pages of a
+    book. Progress is saved to the checkpoint file when one is given, and
+    with resume picked up from it.
+    """
+    numberPages = options.get("numberPages")
+    args = (numberPages,) if numberPages != None else ()
+    state = None
+    if checkpoint != None:
+        state = load_checkpoint(checkpoint, get_checkpoint_key(surface, edgeSet, perms, numberPages), resume)
+        if state["found"] != None:
+            perm, codes = get_found(state)
+            return unpack_embedding(surface, perm, edgeSet, codes, *args)
+
+    counter = count_finished(state)
+    num_perms = len(perms)
+    backspaces = ""
+    graph = -1
+    for position, perm in generate_unfinished(perms, state):
+        progress_message = backspaces + get_progress_message(counter, num_perms)
+        print(progress_message, end="", flush=True)
+        backspaces = len(progress_message) * "\b"
+
+        newEdgeSet = edgeSet.copy()
+        graph = find_with_permutation(perm, newEdgeSet, **options)
+        counter += 1
+        if graph == -1:
+            if state != None:
+                mark_finished(state, [position])
+            continue
+        else:
+            if state != None:
+                record_found(state, perm, pack_embedding(graph, edgeSet))
+            break
+
+    print()
+    if state != None and graph == -1:
+        save_checkpoint(state)
+    return graph
+
+def get_spine_orderings(vertices, file_prefix=None, edgeSet=None):
+    """Spine orderings searched when none are given. With a file prefix they
+    are read from the permutations file. Otherwise one ordering is generated
+    for every class of orderings that are rotations or reflections of each
+    other, or relabellings of each other by an automorphism of edgeSet.
+    """
+    if file_prefix == None:
+        if edgeSet == None:
+            return Permutations.DihedralPerms(vertices)
+        generators = Permutations.get_automorphism_generators(edgeSet, vertices)
+        return Permutations.OrbitPerms(vertices, generators)
+    perms = Permutations.get_perms_from_file(vertices, file_prefix)
+    return Permutations.strings_to_perms(perms)
+
+def get_vertex_degrees(edgeSet):
+    degrees = {}
+    for edge in edgeSet:
+        for vert in edge:
+            degrees[vert] = degrees.get(vert, 0) + 1
+    return degrees
+
+def get_biconnected_components(edgeSet):
+    """Splits edgeSet into its blocks, the biconnected components, with
+    Tarjan's algorithm. Each block keeps its edges in the order of edgeSet.
+    """
+    adjacency = {}
+    for edge in edgeSet:
+        adjacency.setdefault(edge[0], []).append(edge[1])
+        adjacency.setdefault(edge[1], []).append(edge[0])
+
+    depth = {}
+    low = {}
+    edge_stack = []
+    blocks = []
+    for vert in sorted(adjacency):
+        if vert not in depth:
+            visit_biconnected(vert, None, 0, adjacency, depth, low, edge_stack, blocks)
+
+    edge_order = {edge: i for i, edge in enumerate(edgeSet)}
+    for block in blocks:
+        block.sort(key=lambda edge: edge_order[edge])
+    return blocks
+
+def visit_biconnected(vert, parent, vert_depth, adjacency, depth, low, edge_stack, blocks):
+    depth[vert] = vert_depth
+    low[vert] = vert_depth
+    for other in adjacency[vert]:
+        if other == parent:
+            continue
+        edge = (min(vert, other), max(vert, other))
+        if other not in depth:
+            edge_stack.append(edge)
+            visit_biconnected(other, vert, vert_depth + 1, adjacency, depth, low, edge_stack, blocks)
+            low[vert] = min(low[vert], low[other])
+            # vert separates the edges found from other onwards
+            if low[other] >= depth[vert]:
+                block = []
+                while True:
+                    block.append(edge_stack.pop())
+                    if block[-1] == edge:
+                        break
+                blocks.append(block)
+        elif depth[other] < depth[vert]:
+            edge_stack.append(edge)
+            low[vert] = min(low[vert], depth[other])
+
+def choose_next_edge(graph, edge_order="input", degrees=None):
+    """Picks the remaining edge to branch on next.
+    "input" takes the edges in the order they were given. "most_constrained"
+    takes the edge with the fewest available placements, breaking ties by the
+    larger total degree of its endpoints.
+    """
+    if edge_order == "input":
+        return graph.remainingEdges[0]
+    if edge_order == "most_constrained":
+        if degrees == None:
+            degrees = get_vertex_degrees(graph.remainingEdges)
+        return min(graph.remainingEdges, key=lambda edge: (graph.count_available_edges(edge),
+                                                            -degrees[edge[0]] - degrees[edge[1]]))
+    print("invalid edge order")
+    sys.exit()
+
+def place_remaining_edges(graph, edge_order="input"):
+    """Returns True with graph fully placed at the first embedding found by
+    generate_placements, or False with graph as it was given.
+    """
+    for placed in generate_placements(graph, edge_order):
+        return True
+    return False
+
+def generate_placements(graph, edge_order="input"):
+    """Depth-first search for placements of the remaining edges of graph, used
+    for every surface. The stack holds one entry per placed edge: the trail
+    length before it was placed and the placements of it not yet tried, so
+    memory only grows with the number of edges. After every placement the
+    edges left with a single placement are placed too, and the branch is
+    dropped once an edge has none. Yields graph each time it is fully placed,
+    and the search goes on from there when the next one is asked for, so
+    graph must be copied or packed to keep it. Once every placement has been
+    yielded graph is as it was given.
+    """
+    degrees = get_vertex_degrees([edge[0] for edge in graph.addedEdges] + graph.remainingEdges)
+    start_length = graph.get_trail_length()
+    if is_search_cancelled() or not graph.place_forced_edges():
+        graph.undo_placed_edges(start_length)
+        return
+
+    stack = []
+    polls = 0
+    while True:
+        if graph.is_graph_placed():
+            yield graph
+        else:
+            next_edge = choose_next_edge(graph, edge_order, degrees)
+            stack.append((graph.get_trail_length(), iter(graph.get_available_edges(next_edge))))
+
+        while len(stack) > 0:
+            polls += 1
+            if polls % 1024 == 0 and is_search_cancelled():
+                graph.undo_placed_edges(start_length)
+                return
+            trail_length, avail_edges = stack[-1]
+            graph.undo_placed_edges(trail_length)
+            edge = next(avail_edges, None)
+            if edge == None:
+                stack.pop()
+                continue
+            graph.place_edge(edge[0][0], edge[0][1], edge[1])
+            if graph.place_forced_edges():
+                break
+        else:
+            graph.undo_placed_edges(start_length)
+            return
+
+def generate_embeddings(edgeSet, surface, vertices, perms=None, unique=False, edge_order="input", numberPages=1):
+    """Yields every embedding of edgeSet in surface, one of the names of
+    surface_classes: every spine of perms with every placement of its edges
+    found by generate_placements. Edges between neighbouring spine vertices
+    are always drawn along the spine. When no perms are given every spine
+    is searched up to rotation and reflection, or with unique only one spine
+    of each class of spines that are relabellings of each other by an
+    automorphism of edgeSet, so embeddings that are the same up to symmetry
+    are not repeated. Embeddings are made one at a time as they are asked
+    for, and each graph is reused for the next embedding on its spine.
+    """
+    if exceeds_edge_bound(edgeSet, surface, numberPages):
+        return
+    if perms == None:
+        perms = get_spine_orderings(vertices, None, edgeSet if unique else None)
+    args = (numberPages,) if surface == "book" else ()
+    for perm in perms:
+        graph = surface_classes[surface](perm, edgeSet.copy(), *args)
+        graph.place_free_edges()
+        yield from generate_placements(graph, edge_order)
+
+def count_placements(graph, edge_order="input", memo=None):
+    """Counts the placements of the remaining edges of graph that
+    generate_placements would yield, without making any of them. The count
+    of a search state only depends on the placements still available and the
+    edges left, so it is kept in memo under them and identical sub-searches
+    are counted once. A memo is only valid for one spine.
+    """
+    if memo == None:
+        memo = {}
+    start_length = graph.get_trail_length()
+    if not graph.place_forced_edges():
+        graph.undo_placed_edges(start_length)
+        return 0
+
+    key = (tuple(graph.available_masks), graph.remaining_mask)
+    count = memo.get(key)
+    if count == None:
+        count = 0
+        if graph.is_graph_placed():
+            count = 1
+        else:
+            trail_length = graph.get_trail_length()
+            for edge in graph.get_available_edges(choose_next_edge(graph, edge_order)):
+                graph.place_edge(edge[0][0], edge[0][1], edge[1])
+                count += count_placements(graph, edge_order, memo)
+                graph.undo_placed_edges(trail_length)
+        memo[key] = count
+    graph.undo_placed_edges(start_length)
+    return count
+
+def count_with_permutation(perm, edgeSet, surface, placements=False, edge_order="input", numberPages=1):
+    args = (numberPages,) if surface == "book" else ()
+    graph = surface_classes[surface](perm, edgeSet, *args)
+    graph.place_free_edges()
+    if placements:
+        return count_placements(graph, edge_order)
+    return 1 if place_remaining_edges(graph, edge_order) else 0
+
+def run_count_task(job_path, rank):
+    """Counts on the spine of the given rank in a pool worker. A spine with
+    nothing counted gives -1, so nothing is sent back for it.
+    """
+    job = load_pool_job(job_path)
+    count = job["find_with_perm"](get_job_perm(job, rank), edgeSet=job["edgeSet"].copy())
+    return count if count > 0 else -1
+
+def count_embeddings(edgeSet, surface, vertices, perms=None, placements=False, unique=False, edge_order="input",
+                     numberPages=1, pool=None):
+    """Counts the spines of perms on which edgeSet embeds in surface, or with
+    placements the embeddings generate_embeddings would yield, without
+    making a graph for any of them. Spines are chosen as in
+    generate_embeddings. The spines are counted by run_pooled_search, and
+    the counts of the workers added up as they come back.
+    """
+    if exceeds_edge_bound(edgeSet, surface, numberPages):
+        return 0
+    if perms == None:
+        perms = get_spine_orderings(vertices, None, edgeSet if unique else None)
+
+    count_with_perm = partial(count_with_permutation, surface=surface, placements=placements,
+                              edge_order=edge_order, numberPages=numberPages)
+    job, job_path, tasks = write_pool_job(count_with_perm, perms, surface, edgeSet)
+    total = 0
+
+    def add_count(count):
+        nonlocal total
+        total += count
+        return False
+
+    try:
+        run_pooled_search(partial(run_count_task, job_path), tasks, len(perms), pool, on_result=add_count)
+    finally:
+        os.remove(job_path)
+    return total
+
+def find_batch_with_permutation(perm, edgeSets, unresolved, surface, edge_order="input", numberPages=1):
+    """Searches the spine perm for an embedding of each edge set of edgeSets
+    whose index is in unresolved. The position maps and blocking table of the
+    spine are set up once, in one graph that every edge set is searched in
+    and taken back out of. Returns the packed edge types of the embeddings
+    found by index.
+    """
+    args = (numberPages,) if surface == "book" else ()
+    graph = surface_classes[surface](perm, [], *args)
+    found = {}
+    for i in unresolved:
+        graph.remainingEdges = edgeSets[i].copy()
+        graph.count_remaining_options()
+        graph.place_free_edges()
+        if place_remaining_edges(graph, edge_order):
+            found[i] = pack_embedding(graph, edgeSets[i])
+        graph.undo_placed_edges(0)
+    return found
+
+def generate_batch_tasks(ranks, unresolved):
+    """Pairs each spine rank with the indices of the edge sets of a batch
+    still unresolved when it is handed out. Tasks share one tuple of indices
+    until an edge set is solved, so a chunk of them pickles it once.
+    """
+    indices = None
+    for rank in ranks:
+        if indices == None or len(indices) != len(unresolved):
+            indices = tuple(sorted(unresolved))
+        yield rank, indices
+
+def run_batch_task(job_path, task):
+    """Searches the spine of a task from generate_batch_tasks for its
+    unresolved edge sets in a pool worker, leaving out those this worker has
+    already found an embedding of. The embeddings found are sent back as the
+    spine rank and their packed edge types by index, and nothing found as -1.
+    """
+    job = load_pool_job(job_path)
+    rank, unresolved = task
+    solved = job.setdefault("solved", set())
+    unresolved = [i for i in unresolved if i not in solved]
+    if len(unresolved) == 0:
+        return -1
+    found = job["find_with_perm"](get_job_perm(job, rank), job["edgeSet"], unresolved)
+    if len(found) == 0:
+        return -1
+    solved.update(found)
+    return rank, found
+
+def find_embeddings_batch(edgeSets, surface, vertices, perms=None, edge_order="input", numberPages=1, pool=None,
+                          rebuild=True):
+    """Searches for an embedding in surface of every edge set of edgeSets,
+    all on vertices vertices, in one pass over the spines of perms on a
+    search pool with run_pooled_search. Each spine is handed out with the
+    edge sets not solved yet, so solved edge sets drop out of the pass, and
+    the pass is cancelled once every edge set is solved. Without perms every spine is searched up
+    to rotation and reflection. Returns a list with the embedding found for
+    each edge set, as a graph or with rebuild=False as its spine and packed
+    edge types, or -1. While a result cache is open, edge sets with a result
+    stored are left out of the pass, and the results of the others stored
+    with the seconds the pass took.
+    """
+    results = [-1 for edgeSet in edgeSets]
+    unresolved = set(i for i in range(len(edgeSets)) if not exceeds_edge_bound(edgeSets[i], surface, numberPages))
+    cache_keys = {}
+    if ResultCache.result_cache != None:
+        for i in range(len(edgeSets)):
+            key, labelling = ResultCache.get_result_key(edgeSets[i], get_cache_surface(surface, numberPages), vertices)
+            graph = ResultCache.look_up_result(key, labelling, surface_classes[surface], edgeSets[i])
+            if graph == None or not is_result_in_perms(graph, perms):
+                cache_keys[i] = (key, labelling)
+                continue
+            unresolved.discard(i)
+            if graph != -1:
+                results[i] = (get_spine(graph), pack_embedding(graph, edgeSets[i]))
+    prove_missing = perms == None
+    if perms == None:
+        perms = get_spine_orderings(vertices)
+    start = time.perf_counter()
+
+    find_with_perm = partial(find_batch_with_permutation, surface=surface, edge_order=edge_order,
+                             numberPages=numberPages)
+    job, job_path, ranks = write_pool_job(find_with_perm, perms, surface, edgeSets)
+
+    def keep_found(result):
+        rank, found = result
+        for i in found:
+            if results[i] == -1:
+                results[i] = (get_job_perm(job, rank), found[i])
+                unresolved.discard(i)
+        return len(unresolved) == 0
+
+    try:
+        if len(unresolved) > 0:
+            run_pooled_search(partial(run_batch_task, job_path), generate_batch_tasks(ranks, unresolved),
+                              len(perms), pool, on_result=keep_found)
+    finally:
+        os.remove(job_path)
+
+    seconds = time.perf_counter() - start
+    args = (numberPages,) if surface == "book" else ()
+    for i in cache_keys:
+        key, labelling = cache_keys[i]
+        if results[i] != -1:
+            graph = unpack_embedding(surface, results[i][0], edgeSets[i], results[i][1], *args)
+            ResultCache.store_result(key, labelling, graph, None, seconds)
+        elif prove_missing:
+            proof = "edge bound" if exceeds_edge_bound(edgeSets[i], surface, numberPages) else "every spine"
+            ResultCache.store_result(key, labelling, -1, proof, seconds)
+
+    if rebuild:
+        for i in range(len(results)):
+            if results[i] != -1:
+                results[i] = unpack_embedding(surface, results[i][0], edgeSets[i], results[i][1], *args)
+    return results
+
+def reduce_graph(edgeSet, vertices, contract_chains=True):
+    """Strips isolated vertices and leaves, and with contract_chains replaces
+    each vertex of degree 2 whose neighbours are not adjacent by an edge
+    between its neighbours, until none are left. Returns the edges of the
+    kernel that remains, its vertices and the reductions in the order made.
+    """
+    adjacency = {vert: set() for vert in range(1, vertices + 1)}
+    for edge in edgeSet:
+        adjacency[edge[0]].add(edge[1])
+        adjacency[edge[1]].add(edge[0])
+
+    reductions = []
+    reduced = True
+    while reduced:
+        reduced = False
+        for vert in sorted(adjacency):
+            neighbours = sorted(adjacency[vert])
+            if len(neighbours) == 0:
+                reductions.append(("isolated", vert))
+            elif len(neighbours) == 1:
+                reductions.append(("leaf", vert, neighbours[0]))
+            elif len(neighbours) == 2 and contract_chains and neighbours[1] not in adjacency[neighbours[0]]:
+                reductions.append(("chain", vert, neighbours[0], neighbours[1]))
+                adjacency[neighbours[0]].add(neighbours[1])
+                adjacency[neighbours[1]].add(neighbours[0])
+            else:
+                continue
+            for other in neighbours:
+                adjacency[other].discard(vert)
+            del adjacency[vert]
+            reduced = True
+
+    kernel_edges = [(vert, other) for vert in sorted(adjacency) for other in sorted(adjacency[vert]) if vert < other]
+    return kernel_edges, sorted(adjacency), reductions
+
+def reinsert_reductions(spine, reductions, after=True):
+    """Puts the vertices removed by reduce_graph back on a spine of the
+    kernel. A leaf goes right after the vertex it hung from, and a chain
+    vertex right after its first neighbour, or with after=False right
+    before the vertex or second neighbour.
+    """
+    spine = spine.copy()
+    for reduction in reversed(reductions):
+        if reduction[0] == "isolated":
+            spine.append(reduction[1])
+        elif after:
+            spine.insert(spine.index(reduction[2]) + 1, reduction[1])
+        else:
+            spine.insert(spine.index(reduction[-1]), reduction[1])
+    return spine
+
+def find_embedding_by_reduction(edgeSet, vertices, find_embedding, find_with_permutation, edge_order="input", **options):
+    """Searches for an embedding of the kernel left by reduce_graph with the
+    sweep find_embedding, and tries the spine it gives with the removed
+    vertices put back. A kernel with only leaves and isolated vertices taken
+    off is a subgraph, so -1 is returned when it cannot embed. Contracted
+    chains only ever give a spine to try. Returns None when nothing can be
+    reduced or no spine was found that embeds edgeSet, and the caller
+    searches the whole graph.
+    """
+    for contract_chains in [True, False]:
+        kernel_edges, kernel_verts, reductions = reduce_graph(edgeSet, vertices, contract_chains)
+        if len(reductions) == 0:
+            return None
+        # without chains the kernel is the one the second pass would find
+        if not any(reduction[0] == "chain" for reduction in reductions):
+            contract_chains = False
+
+        kernel_spine = []
+        if len(kernel_verts) > 0:
+            print("Searching a kernel of " + str(len(kernel_verts)) + " vertices")
+            relabel = {vert: i + 1 for i, vert in enumerate(kernel_verts)}
+            graph = find_embedding([(relabel[edge[0]], relabel[edge[1]]) for edge in kernel_edges],
+                                   vertices=len(kernel_verts), edge_order=edge_order, **options)
+            if graph == -1:
+                if not contract_chains:
+                    return -1
                 continue
-            
-            next_edge = graph.remainingEdges[0]
-            avail_edges = graph.get_available_edges(next_edge)
+            spine = graph[0] if isinstance(graph, tuple) else get_spine(graph)
+            kernel_spine = [kernel_verts[vert - 1] for vert in spine]
+
+        for after in [True, False]:
+            graph = find_with_permutation(reinsert_reductions(kernel_spine, reductions, after), edgeSet.copy(),
+                                          edge_order=edge_order)
+            if graph != -1:
+                return graph
+        if not contract_chains:
+            return None
+    return None
+
+def is_result_in_perms(graph, perms):
+    """Checks that a stored result answers a sweep over perms. A -1 is only
+    stored as a proof over every spine, so it answers any sweep. Dihedral
+    and orbit orderings sweep every spine up to symmetry, so any stored
+    embedding answers them too, without looping over them. Otherwise an
+    embedding only answers a sweep whose perms hold its spine.
+    """
+    if graph == -1 or perms == None:
+        return True
+    if isinstance(perms, (Permutations.DihedralPerms, Permutations.OrbitPerms)):
+        return True
+    spine = list(get_spine(graph))
+    return any(list(perm) == spine for perm in perms)
+
+def get_cache_surface(surface, numberPages=1):
+    """Surface a result is stored under in the result cache. Book results are
+    stored for each number of pages, as an embedding in that many pages or a
+    proof that there is none.
+    """
+    if surface == "book":
+        return "book " + str(numberPages)
+    return surface
+
+def get_first_page_count(edgeSet):
+    """Fewest pages find_book_embedding tries, the first that the edge bound
+    does not rule out.
+    """
+    num_pages = 2
+    while exceeds_edge_bound(edgeSet, "book", num_pages):
+        num_pages += 1
+    return num_pages
+
+def look_up_cached_result(edgeSet, surface, vertices, labelling, edges):
+    """Returns the result stored for edgeSet, with canonical labelling and
+    edges, in surface, or None. For a book it is the embedding stored for
+    the fewest pages, which only answers when every smaller page count from
+    get_first_page_count up is stored as having no embedding.
+    """
+    if surface != "book":
+        key = ResultCache.get_surface_key(surface, vertices, edges)
+        return ResultCache.look_up_result(key, labelling, surface_classes[surface], edgeSet)
+    num_pages = get_first_page_count(edgeSet)
+    while True:
+        key = ResultCache.get_surface_key(get_cache_surface("book", num_pages), vertices, edges)
+        graph = ResultCache.look_up_result(key, labelling, BookEmbedding, edgeSet)
+        if graph != -1:
+            return graph
+        num_pages += 1
+
+def store_cached_result(edgeSet, surface, vertices, labelling, edges, graph, every_spine, seconds):
+    """Stores the result of a sweep for edgeSet in surface. Only a sweep over
+    every spine ordering proves that there is no embedding, so -1 is only
+    stored for one. A book sweep gives the fewest pages an embedding needs,
+    which is only known over every spine ordering too. Its embedding is
+    stored then, along with -1 for each smaller page count it tried.
+    """
+    if surface == "book":
+        if not every_spine:
+            return
+        for num_pages in range(get_first_page_count(edgeSet), graph.numPages):
+            key = ResultCache.get_surface_key(get_cache_surface("book", num_pages), vertices, edges)
+            ResultCache.store_result(key, labelling, -1, "every spine", seconds)
+        key = ResultCache.get_surface_key(get_cache_surface("book", graph.numPages), vertices, edges)
+        ResultCache.store_result(key, labelling, graph, None, seconds)
+        return
+    key = ResultCache.get_surface_key(surface, vertices, edges)
+    if graph != -1:
+        ResultCache.store_result(key, labelling, graph, None, seconds)
+    elif every_spine:
+        proof = "edge bound" if exceeds_edge_bound(edgeSet, surface) else "every spine"
+        ResultCache.store_result(key, labelling, graph, proof, seconds)
 
-            for edge in avail_edges:
-                new_graph = graph.copy()
-                new_graph.place_edge(edge[0][0], edge[0][1], edge[1])
-                new_graphs.append(new_graph)
-        graphs = new_graphs
+def uses_result_cache(surface):
+    """Makes a sweep consult the result cache, while one is open, before any
+    search, and store what it finds with store_cached_result and the seconds
+    it took. A stored embedding whose spine is not one of the perms or file
+    orderings asked for is not used.
+    """
+    def decorate(find_embedding):
+        signature = inspect.signature(find_embedding)
 
+        @wraps(find_embedding)
+        def find_with_result_cache(*args, **kwargs):
+            options = signature.bind(*args, **kwargs)
+            options.apply_defaults()
+            options = options.arguments
+            edgeSet = options["edgeSet"]
+            vertices = options["vertices"]
+            perms = options["perms"]
+            if vertices == None and isinstance(perms, (Permutations.DihedralPerms, Permutations.OrbitPerms)):
+                vertices = perms.num_elements
+            elif vertices == None and perms != None and len(perms) > 0:
+                vertices = len(next(iter(perms)))
+            if ResultCache.result_cache == None or vertices == None:
+                return find_embedding(*args, **kwargs)
+
+            if perms == None and options["file_prefix"] != None:
+                perms = get_spine_orderings(vertices, options["file_prefix"])
+            labelling, edges = ResultCache.get_canonical_labelling(edgeSet, vertices)
+            graph = look_up_cached_result(edgeSet, surface, vertices, labelling, edges)
+            if graph == None or not is_result_in_perms(graph, perms):
+                start = time.perf_counter()
+                graph = find_embedding(*args, **kwargs)
+                seconds = time.perf_counter() - start
+                if isinstance(graph, tuple):
+                    graph = unpack_embedding(surface, graph[0], edgeSet, graph[1])
+                every_spine = options["perms"] == None and options["file_prefix"] == None and not is_search_cancelled()
+                store_cached_result(edgeSet, surface, vertices, labelling, edges, graph, every_spine, seconds)
+            return pack_result(graph, edgeSet, options.get("rebuild", True))
+
+        return find_with_result_cache
+    return decorate
+
+def find_mobius_embedding_with_permutation(perm, edgeSet, edge_order="input"):
+    edgeSet = edgeSet.copy()
+    genA = MobiusGraph(perm, edgeSet)
+    genA.place_free_edges()
+
+    if place_remaining_edges(genA, edge_order):
+        return genA
     return -1
 
-def find_book_embedding(edgeSet, perms=None, vertices=None, file_prefix="flip_perms_"):
+@uses_result_cache("book")
+def find_book_embedding(edgeSet, perms=None, vertices=None, file_prefix=None, checkpoint=None, resume=False):
+    if perms == None and file_prefix == None and vertices != None:
+        graph = find_book_embedding_by_blocks(edgeSet, vertices, checkpoint, resume)
+        if graph != None:
+            return graph
+
     if perms == None:
         if vertices == None: 
             print("When perms are not specified, the number of vertices must also be given.")
-            print("find_klein_embedding(edgeSet, perms=None, vertices=None, file_prefix=\"flip_perms_\")")
+            print("find_klein_embedding(edgeSet, perms=None, vertices=None, file_prefix=None)")
             sys.exit()
-        perms = Permutations.get_perms_from_file(vertices, file_prefix)
-        perms = Permutations.strings_to_perms(perms)
-    
-    counter = 0
-    num_perms = len(perms)
-    backspaces = ""
+        perms = get_spine_orderings(vertices, file_prefix, edgeSet)
 
-    num_pages = 2
+    num_pages = get_first_page_count(edgeSet)
     while (True):
         print("Testing for " + str(num_pages) + "-page embeddings...")
 
-        for perm in perms:
-            progress_message = backspaces + "Graphs Completed: " + str(counter) + " / " + str(num_perms)
-            print(progress_message, end="", flush=True)
-            backspaces = len(progress_message) * "\b"
+        graph = run_sweep(find_book_embedding_with_permutation, perms, "book", edgeSet, checkpoint, resume,
+                          numberPages=num_pages)
+        if graph != -1:
+            return graph
+        num_pages += 1
 
-            newEdgeSet = edgeSet.copy()
-            graph = find_book_embedding_with_permutation(perm, newEdgeSet, num_pages)
-            counter += 1
-            if graph == -1:
-                continue
-            else:
-                print()
-                return graph
+def find_book_embedding_by_blocks(edgeSet, vertices, checkpoint=None, resume=False):
+    """Finds a book embedding of edgeSet from book embeddings of its blocks,
+    each searched on its own with its vertices relabelled 1 - b. The book
+    thickness of a graph is the largest of its blocks. Each block's spine is
+    rotated to start at the vertex it shares with the blocks already on the
+    spine and inserted right after that vertex, so it crosses none of their
+    edges. The result is checked by placing every edge again. Returns None
+    when edgeSet is a single block on all the vertices, or the check fails.
+    """
+    blocks = get_biconnected_components(edgeSet)
+    num_block_verts = len(set(vert for edge in edgeSet for vert in edge))
+    if len(blocks) == 0 or (len(blocks) == 1 and num_block_verts == vertices):
+        return None
 
-        print()
-        counter = 0
-        num_pages += 1
+    block_spines = []
+    pages = {}
+    num_pages = 2
+    for i in range(len(blocks)):
+        block_verts = sorted(set(vert for edge in blocks[i] for vert in edge))
+        if len(blocks[i]) == 1:
+            block_spines.append(block_verts)
+            pages[blocks[i][0]] = 1
+            continue
+
+        print("Block " + str(i + 1) + " / " + str(len(blocks)) + " with " + str(len(block_verts)) + " vertices")
+        relabel = {vert: j + 1 for j, vert in enumerate(block_verts)}
+        block_edges = [(relabel[edge[0]], relabel[edge[1]]) for edge in blocks[i]]
+        graph = find_book_embedding(block_edges, vertices=len(block_verts), checkpoint=checkpoint, resume=resume)
+        block_spines.append([block_verts[vert - 1] for vert in graph.spine])
+        for edge in graph.addedEdges:
+            pages[(block_verts[edge[0][0] - 1], block_verts[edge[0][1] - 1])] = edge[1]
+        num_pages = max(num_pages, graph.numPages)
+
+    spine = []
+    unplaced = list(range(len(block_spines)))
+    while len(unplaced) > 0:
+        # a block sharing a vertex with the spine shares exactly one
+        next_block = unplaced[0]
+        for i in unplaced:
+            if any(vert in spine for vert in block_spines[i]):
+                next_block = i
+                break
+        unplaced.remove(next_block)
+
+        block_spine = block_spines[next_block]
+        shared = [vert for vert in block_spine if vert in spine]
+        if len(shared) == 0:
+            spine.extend(block_spine)
+            continue
+        start = block_spine.index(shared[0])
+        at = spine.index(shared[0]) + 1
+        spine[at:at] = block_spine[start + 1:] + block_spine[:start]
+
+    spine.extend(vert for vert in range(1, vertices + 1) if vert not in spine)
+
+    graph = BookEmbedding(spine, edgeSet.copy(), num_pages)
+    graph.place_free_edges()
+    for edge in edgeSet:
+        if edge in graph.remainingEdges:
+            if graph.place_edge(edge[0], edge[1], pages[edge]) != None:
+                return None
+    if not graph.is_graph_placed():
+        return None
+    return graph
 
 def find_book_embedding_with_permutation(perm, edgeSet, numberPages=1):
+    """Assigns pages on a fixed spine by colouring the conflict graph of its
+    crossing edges instead of branching on edges, so unlike the other
+    surfaces it takes no edge order.
+    """
+    if numberPages <= 2:
+        return find_two_page_book_embedding_with_permutation(perm, edgeSet, numberPages)
+    return find_k_page_book_embedding_with_permutation(perm, edgeSet, numberPages)
+
+def get_crossing_edges(perm, edgeSet):
+    """Builds the conflict graph of a spine: each edge is mapped to the edges
+    whose endpoints interleave with its own, so the two cannot share a page.
+    """
+    position = {vert: i for i, vert in enumerate(perm)}
+    spans = []
+    for edge in edgeSet:
+        smaller, larger = sorted((position[edge[0]], position[edge[1]]))
+        spans.append((smaller, larger, edge))
+    spans.sort()
+
+    crossings = {edge: [] for edge in edgeSet}
+    for i in range(len(spans)):
+        smaller, larger, edge = spans[i]
+        for j in range(i + 1, len(spans)):
+            other_smaller, other_larger, other = spans[j]
+            if other_smaller >= larger:
+                break
+            if smaller < other_smaller and larger < other_larger:
+                crossings[edge].append(other)
+                crossings[other].append(edge)
+    return crossings
+
+def find_two_page_book_embedding_with_permutation(perm, edgeSet, numberPages=2):
+    """Finds a book embedding with at most two pages on a fixed spine without
+    branching. Two edges must go on different pages exactly when they cross,
+    so an embedding exists when the conflict graph can be 2-coloured.
+    """
     edgeSet = edgeSet.copy()
     genA = BookEmbedding(perm, edgeSet, numberPages)
     genA.place_free_edges()
-    graphs = [genA]
+    if not genA.is_possible_to_embedd():
+        return -1
 
-    while len(graphs) > 0:
-        new_graphs = []
-        for graph in graphs:
-            if graph.is_graph_placed():
-                return graph
-            if not graph.is_possible_to_embedd():
+    crossings = get_crossing_edges(perm, genA.remainingEdges)
+    pages = {}
+    for first_edge in genA.remainingEdges:
+        if first_edge in pages:
+            continue
+        pages[first_edge] = 1
+        to_visit = [first_edge]
+        while len(to_visit) > 0:
+            edge = to_visit.pop()
+            for other in crossings[edge]:
+                if other not in pages:
+                    pages[other] = 3 - pages[edge]
+                    to_visit.append(other)
+                elif pages[other] == pages[edge]:
+                    return -1
+        if numberPages < max(pages.values()):
+            return -1
+
+    for edge in list(genA.remainingEdges):
+        genA.place_edge(edge[0], edge[1], pages[edge])
+    return genA
+
+def find_crossing_clique(crossings):
+    """Greedily finds a set of pairwise crossing edges. Each of them needs its
+    own page, so its size is a lower bound on the number of pages.
+    """
+    best_clique = []
+    by_degree = sorted(crossings, key=lambda edge: len(crossings[edge]), reverse=True)
+    for first_edge in by_degree:
+        if len(crossings[first_edge]) < len(best_clique):
+            break
+        clique = [first_edge]
+        candidates = set(crossings[first_edge])
+        for edge in by_degree:
+            if edge in candidates:
+                clique.append(edge)
+                candidates &= set(crossings[edge])
+        if len(clique) > len(best_clique):
+            best_clique = clique
+    return best_clique
+
+def colour_crossing_edges(crossings, numberPages):
+    """Exact DSATUR colouring of a conflict graph with numberPages colours.
+    The edges of a crossing clique are given pages 1, 2, ... first, then the
+    edge whose crossing edges already use the most pages is coloured next, and
+    an edge only opens the lowest page not used yet so that page orders are
+    never tried twice. Returns a map of edges to pages, or None.
+    """
+    clique = find_crossing_clique(crossings)
+    if len(clique) > numberPages:
+        return None
+
+    pages = {}
+    # page_counts[edge][page] is how many crossing edges of edge use page
+    page_counts = {edge: [0] * (numberPages + 1) for edge in crossings}
+    saturation = {edge: 0 for edge in crossings}
+
+    def set_page(edge, page):
+        pages[edge] = page
+        for other in crossings[edge]:
+            page_counts[other][page] += 1
+            if page_counts[other][page] == 1:
+                saturation[other] += 1
+
+    def clear_page(edge):
+        page = pages.pop(edge)
+        for other in crossings[edge]:
+            page_counts[other][page] -= 1
+            if page_counts[other][page] == 0:
+                saturation[other] -= 1
+
+    def colour_next(used_pages):
+        if len(pages) == len(crossings):
+            return True
+        edge = max((edge for edge in crossings if edge not in pages),
+                   key=lambda edge: (saturation[edge], len(crossings[edge])))
+        if saturation[edge] == numberPages:
+            return False
+        for page in range(1, min(used_pages + 1, numberPages) + 1):
+            if page_counts[edge][page] > 0:
                 continue
-            
-            next_edge = graph.remainingEdges[0]
-            avail_edges = graph.get_available_edges(next_edge)
+            set_page(edge, page)
+            if colour_next(max(used_pages, page)):
+                return True
+            clear_page(edge)
+        return False
 
-            for edge in avail_edges:
-                new_graph = graph.copy()
-                new_graph.place_edge(edge[0][0], edge[0][1], edge[1])
-                new_graphs.append(new_graph)
-        graphs = new_graphs
+    for i in range(len(clique)):
+        set_page(clique[i], i + 1)
+    if colour_next(len(clique)):
+        return pages
+    return None
 
-    return -1
+def find_k_page_book_embedding_with_permutation(perm, edgeSet, numberPages):
+    """Finds a book embedding with numberPages pages on a fixed spine by
+    colouring the conflict graph of its crossing edges.
+    """
+    edgeSet = edgeSet.copy()
+    genA = BookEmbedding(perm, edgeSet, numberPages)
+    genA.place_free_edges()
+    if not genA.is_possible_to_embedd():
+        return -1
+
+    pages = colour_crossing_edges(get_crossing_edges(perm, genA.remainingEdges), numberPages)
+    if pages == None:
+        return -1
+
+    for edge in list(genA.remainingEdges):
+        genA.place_edge(edge[0], edge[1], pages[edge])
+    return genA
+
+@uses_result_cache("mobius")
+def find_mobius_embedding(edgeSet, perms=None, vertices=None, file_prefix=None, edge_order="input",
+                             pool=None, rebuild=True, checkpoint=None, resume=False):
+    if exceeds_edge_bound(edgeSet, "mobius"):
+        return -1
+    if perms == None and file_prefix == None and vertices != None:
+        graph = find_embedding_by_reduction(edgeSet, vertices, find_mobius_embedding, find_mobius_embedding_with_permutation,
+                                            edge_order, pool=pool, rebuild=rebuild, checkpoint=checkpoint, resume=resume)
+        if graph != None:
+            return pack_result(graph, edgeSet, rebuild)
 
-def find_mobius_embedding(edgeSet, perms=None, vertices=None, file_prefix="flip_perms_"):
     if perms == None:
         if vertices == None: 
             print("When perms are not specified, the number of vertices must also be given.")
             sys.exit()
-        perms = Permutations.get_perms_from_file(vertices, file_prefix)
-        perms = Permutations.strings_to_perms(perms)
+        perms = get_spine_orderings(vertices, file_prefix, edgeSet)
     
-    counter = 0
-    num_perms = len(perms)
-    backspaces = ""
-    progress_message = backspaces + "Graphs Completed: " + str(counter) + " / " + str(num_perms)
-    print(progress_message, end="", flush=True)
-    backspaces = len(progress_message) * "\b"
-
-    final_graph = -1
-    with Pool(cpu_count() - 2) as pool:
-        for graph in pool.imap_unordered(partial(find_mobius_embedding_with_permutation, edgeSet=edgeSet), perms):
-            counter += 1
-            progress_message = backspaces + "Graphs Completed: " + str(counter) + " / " + str(num_perms)
-            print(progress_message, end="", flush=True)
-            backspaces = len(progress_message) * "\b"
-
-            if graph == -1:
-                continue
-            else:
-                final_graph = graph
-                break
-
-    return final_graph
+    find_with_perm = partial(find_mobius_embedding_with_permutation, edge_order=edge_order)
+    return run_pooled_sweep(find_with_perm, perms, "mobius", edgeSet, pool, rebuild, checkpoint, resume)
 
 def create_complete_graph_edge_set(numVertices):
     edgeSet = []
@@ -152,254 +1331,146 @@ def create_complete_bipartite_graph_edge_set(numVertsA, numVertsB):
 
     return edgeSet
 
-def find_klein_embedding_with_permutation(perm, edgeSet):
+def find_klein_embedding_with_permutation(perm, edgeSet, edge_order="input"):
     genA = KleinGraph(perm, edgeSet)
     genA.place_free_edges()
-    graphs = [genA]
-
-    while len(graphs) > 0:
-        new_graphs = []
-        for graph in graphs:
-            if graph.is_graph_placed():
-                return graph
-            if not graph.is_possible_to_embedd():
-                continue
-            
-            next_edge = graph.remainingEdges[0]
-            avail_edges = graph.get_available_edges(next_edge)
-
-            for edge in avail_edges:
-                new_graph = graph.copy()
-                new_graph.place_edge(edge[0][0], edge[0][1], edge[1])
-                new_graphs.append(new_graph)
-        graphs = new_graphs
 
+    if place_remaining_edges(genA, edge_order):
+        return genA
     return -1
 
-def find_klein_embedding(edgeSet, perms=None, vertices=None, file_prefix="flip_perms_"):
+@uses_result_cache("klein")
+def find_klein_embedding(edgeSet, perms=None, vertices=None, file_prefix=None, edge_order="input", checkpoint=None,
+                         resume=False):
+    if exceeds_edge_bound(edgeSet, "klein"):
+        return -1
+    if perms == None and file_prefix == None and vertices != None:
+        graph = find_embedding_by_reduction(edgeSet, vertices, find_klein_embedding, find_klein_embedding_with_permutation,
+                                            edge_order, checkpoint=checkpoint, resume=resume)
+        if graph != None:
+            return graph
+
     if perms == None:
         if vertices == None: 
             print("When perms are not specified, the number of vertices must also be given.")
-            print("find_klein_embedding(edgeSet, perms=None, vertices=None, file_prefix=\"flip_perms_\")")
+            print("find_klein_embedding(edgeSet, perms=None, vertices=None, file_prefix=None)")
             sys.exit()
-        perms = Permutations.get_perms_from_file(vertices, file_prefix)
-        perms = Permutations.strings_to_perms(perms)
-    
-    counter = 0
-    num_perms = len(perms)
-    backspaces = ""
-    for perm in perms:
-        progress_message = backspaces + "Graphs Completed: " + str(counter) + " / " + str(num_perms)
-        print(progress_message, end="", flush=True)
-        backspaces = len(progress_message) * "\b"
-
-        newEdgeSet = edgeSet.copy()
-        graph = find_klein_embedding_with_permutation(perm, newEdgeSet)
-        counter += 1
-        if graph == -1:
-            continue
-        else:
-            print()
-            return graph
+        perms = get_spine_orderings(vertices, file_prefix, edgeSet)
+    return run_sweep(find_klein_embedding_with_permutation, perms, "klein", edgeSet, checkpoint, resume,
+                     edge_order=edge_order)
 
-    print()
-    return graph
-
-def find_torus_embedding_with_permutation(perm, edgeSet):
+def find_torus_embedding_with_permutation(perm, edgeSet, edge_order="input"):
     genA = TorusGraph(perm, edgeSet)
     genA.place_free_edges()
-    graphs = [genA]
-
-    while len(graphs) > 0:
-        new_graphs = []
-        for graph in graphs:
-            if graph.is_graph_placed():
-                return graph
-            if not graph.is_possible_to_embedd():
-                continue
-            
-            next_edge = graph.remainingEdges[0]
-            avail_edges = graph.get_available_edges(next_edge)
-
-            for edge in avail_edges:
-                new_graph = graph.copy()
-                new_graph.place_edge(edge[0][0], edge[0][1], edge[1])
-                new_graphs.append(new_graph)
-        graphs = new_graphs
 
+    if place_remaining_edges(genA, edge_order):
+        return genA
     return -1
 
-def find_torus_embedding(edgeSet, perms=None, vertices=None, file_prefix="flip_perms_"):
+@uses_result_cache("torus")
+def find_torus_embedding(edgeSet, perms=None, vertices=None, file_prefix=None, edge_order="input", checkpoint=None,
+                         resume=False):
+    if exceeds_edge_bound(edgeSet, "torus"):
+        return -1
+    if perms == None and file_prefix == None and vertices != None:
+        graph = find_embedding_by_reduction(edgeSet, vertices, find_torus_embedding, find_torus_embedding_with_permutation,
+                                            edge_order, checkpoint=checkpoint, resume=resume)
+        if graph != None:
+            return graph
+
     if perms == None:
         if vertices == None: 
             print("When perms are not specified, the number of vertices must also be given.")
-            print("find_klein_embedding(edgeSet, perms=None, vertices=None, file_prefix=\"flip_perms_\")")
+            print("find_klein_embedding(edgeSet, perms=None, vertices=None, file_prefix=None)")
             sys.exit()
-        perms = Permutations.get_perms_from_file(vertices, file_prefix)
-        perms = Permutations.strings_to_perms(perms)
-    
-    counter = 0
-    num_perms = len(perms)
-    backspaces = ""
-    for perm in perms:
-        progress_message = backspaces + "Graphs Completed: " + str(counter) + " / " + str(num_perms)
-        print(progress_message, end="", flush=True)
-        backspaces = len(progress_message) * "\b"
+        perms = get_spine_orderings(vertices, file_prefix, edgeSet)
+    return run_sweep(find_torus_embedding_with_permutation, perms, "torus", edgeSet, checkpoint, resume,
+                     edge_order=edge_order)
 
-        newEdgeSet = edgeSet.copy()
-        graph = find_torus_embedding_with_permutation(perm, newEdgeSet)
-        counter += 1
-        if graph == -1:
-            continue
-        else:
-            print()
-            return graph
-
-    print()
-    return graph
+@uses_result_cache("klein")
+def find_klein_embedding_threaded(edgeSet, perms=None, vertices=None, file_prefix=None, edge_order="input",
+                                     pool=None, rebuild=True, checkpoint=None, resume=False):
+    if exceeds_edge_bound(edgeSet, "klein"):
+        return -1
+    if perms == None and file_prefix == None and vertices != None:
+        graph = find_embedding_by_reduction(edgeSet, vertices, find_klein_embedding_threaded, find_klein_embedding_with_permutation,
+                                            edge_order, pool=pool, rebuild=rebuild, checkpoint=checkpoint, resume=resume)
+        if graph != None:
+            return pack_result(graph, edgeSet, rebuild)
 
-def find_klein_embedding_threaded(edgeSet, perms=None, vertices=None, file_prefix="flip_perms_"):
     if perms == None:
         if vertices == None: 
             print("When perms are not specified, the number of vertices must also be given.")
             sys.exit()
-        perms = Permutations.get_perms_from_file(vertices, file_prefix)
-        perms = Permutations.strings_to_perms(perms)
+        perms = get_spine_orderings(vertices, file_prefix, edgeSet)
     
-    counter = 0
-    num_perms = len(perms)
-    backspaces = ""
-    progress_message = backspaces + "Graphs Completed: " + str(counter) + " / " + str(num_perms)
-    print(progress_message, end="", flush=True)
-    backspaces = len(progress_message) * "\b"
+    find_with_perm = partial(find_klein_embedding_with_permutation, edge_order=edge_order)
+    return run_pooled_sweep(find_with_perm, perms, "klein", edgeSet, pool, rebuild, checkpoint, resume)
 
-    final_graph = -1
-    with Pool(cpu_count() - 2) as pool:
-        for graph in pool.imap_unordered(partial(find_klein_embedding_with_permutation, edgeSet=edgeSet), perms):
-            counter += 1
-            progress_message = backspaces + "Graphs Completed: " + str(counter) + " / " + str(num_perms)
-            print(progress_message, end="", flush=True)
-            backspaces = len(progress_message) * "\b"
+@uses_result_cache("torus")
+def find_torus_embedding_threaded(edgeSet, perms=None, vertices=None, file_prefix=None, edge_order="input",
+                                     pool=None, rebuild=True, checkpoint=None, resume=False):
+    if exceeds_edge_bound(edgeSet, "torus"):
+        return -1
+    if perms == None and file_prefix == None and vertices != None:
+        graph = find_embedding_by_reduction(edgeSet, vertices, find_torus_embedding_threaded, find_torus_embedding_with_permutation,
+                                            edge_order, pool=pool, rebuild=rebuild, checkpoint=checkpoint, resume=resume)
+        if graph != None:
+            return pack_result(graph, edgeSet, rebuild)
 
-            if graph == -1:
-                continue
-            else:
-                final_graph = graph
-                break
-
-    return final_graph
-
-def find_torus_embedding_threaded(edgeSet, perms=None, vertices=None, file_prefix="flip_perms_"):
     if perms == None:
         if vertices == None: 
             print("When perms are not specified, the number of vertices must also be given.")
             sys.exit()
-        perms = Permutations.get_perms_from_file(vertices, file_prefix)
-        perms = Permutations.strings_to_perms(perms)
+        perms = get_spine_orderings(vertices, file_prefix, edgeSet)
     
-    counter = 0
-    num_perms = len(perms)
-    backspaces = ""
-    progress_message = backspaces + "Graphs Completed: " + str(counter) + " / " + str(num_perms)
-    print(progress_message, end="", flush=True)
-    backspaces = len(progress_message) * "\b"
-
-    final_graph = -1
-    with Pool(cpu_count() - 2) as pool:
-        for graph in pool.imap_unordered(partial(find_torus_embedding_with_permutation, edgeSet=edgeSet), perms):
-            counter += 1
-            progress_message = backspaces + "Graphs Completed: " + str(counter) + " / " + str(num_perms)
-            print(progress_message, end="", flush=True)
-            backspaces = len(progress_message) * "\b"
-
-            if graph == -1:
-                continue
-            else:
-                final_graph = graph
-                break
-
-    return final_graph
+    find_with_perm = partial(find_torus_embedding_with_permutation, edge_order=edge_order)
+    return run_pooled_sweep(find_with_perm, perms, "torus", edgeSet, pool, rebuild, checkpoint, resume)
 
-def find_klein_b_embedding_with_permutation(perm, edgeSet):
+def find_klein_b_embedding_with_permutation(perm, edgeSet, edge_order="input"):
     genA = KleinGraphB(perm, edgeSet)
     genA.place_free_edges()
-    graphs = [genA]
-
-    while len(graphs) > 0:
-        new_graphs = []
-        for graph in graphs:
-            if graph.is_graph_placed():
-                return graph
-            if not graph.is_possible_to_embedd():
-                continue
-            
-            next_edge = graph.remainingEdges[0]
-            avail_edges = graph.get_available_edges(next_edge)
-
-            for edge in avail_edges:
-                new_graph = graph.copy()
-                new_graph.place_edge(edge[0][0], edge[0][1], edge[1])
-                new_graphs.append(new_graph)
-        graphs = new_graphs
 
+    if place_remaining_edges(genA, edge_order):
+        return genA
     return -1
 
-def find_klein_b_embedding(edgeSet, perms=None, vertices=None, file_prefix="flip_perms_"):
+@uses_result_cache("klein_b")
+def find_klein_b_embedding(edgeSet, perms=None, vertices=None, file_prefix=None, edge_order="input", checkpoint=None,
+                           resume=False):
+    if exceeds_edge_bound(edgeSet, "klein_b"):
+        return -1
+    if perms == None and file_prefix == None and vertices != None:
+        graph = find_embedding_by_reduction(edgeSet, vertices, find_klein_b_embedding, find_klein_b_embedding_with_permutation,
+                                            edge_order, checkpoint=checkpoint, resume=resume)
+        if graph != None:
+            return graph
+
     if perms == None:
         if vertices == None: 
             print("When perms are not specified, the number of vertices must also be given.")
-            print("find_klein_embedding(edgeSet, perms=None, vertices=None, file_prefix=\"flip_perms_\")")
+            print("find_klein_embedding(edgeSet, perms=None, vertices=None, file_prefix=None)")
             sys.exit()
-        perms = Permutations.get_perms_from_file(vertices, file_prefix)
-        perms = Permutations.strings_to_perms(perms)
-    
-    counter = 0
-    num_perms = len(perms)
-    backspaces = ""
-    for perm in perms:
-        progress_message = backspaces + "Graphs Completed: " + str(counter) + " / " + str(num_perms)
-        print(progress_message, end="", flush=True)
-        backspaces = len(progress_message) * "\b"
+        perms = get_spine_orderings(vertices, file_prefix, edgeSet)
+    return run_sweep(find_klein_b_embedding_with_permutation, perms, "klein_b", edgeSet, checkpoint, resume,
+                     edge_order=edge_order)
 
-        newEdgeSet = edgeSet.copy()
-        graph = find_klein_b_embedding_with_permutation(perm, newEdgeSet)
-        counter += 1
-        if graph == -1:
-            continue
-        else:
-            print()
-            return graph
-
-    print()
-    return graph
+@uses_result_cache("klein_b")
+def find_klein_b_embedding_threaded(edgeSet, perms=None, vertices=None, file_prefix=None, edge_order="input",
+                                       pool=None, rebuild=True, checkpoint=None, resume=False):
+    if exceeds_edge_bound(edgeSet, "klein_b"):
+        return -1
+    if perms == None and file_prefix == None and vertices != None:
+        graph = find_embedding_by_reduction(edgeSet, vertices, find_klein_b_embedding_threaded, find_klein_b_embedding_with_permutation,
+                                            edge_order, pool=pool, rebuild=rebuild, checkpoint=checkpoint, resume=resume)
+        if graph != None:
+            return pack_result(graph, edgeSet, rebuild)
 
-def find_klein_b_embedding_threaded(edgeSet, perms=None, vertices=None, file_prefix="flip_perms_"):
     if perms == None:
         if vertices == None: 
             print("When perms are not specified, the number of vertices must also be given.")
             sys.exit()
-        perms = Permutations.get_perms_from_file(vertices, file_prefix)
-        perms = Permutations.strings_to_perms(perms)
+        perms = get_spine_orderings(vertices, file_prefix, edgeSet)
     
-    counter = 0
-    num_perms = len(perms)
-    backspaces = ""
-    progress_message = backspaces + "Graphs Completed: " + str(counter) + " / " + str(num_perms)
-    print(progress_message, end="", flush=True)
-    backspaces = len(progress_message) * "\b"
-
-    final_graph = -1
-    with Pool(cpu_count() - 2) as pool:
-        for graph in pool.imap_unordered(partial(find_klein_b_embedding_with_permutation, edgeSet=edgeSet), perms):
-            counter += 1
-            progress_message = backspaces + "Graphs Completed: " + str(counter) + " / " + str(num_perms)
-            print(progress_message, end="", flush=True)
-            backspaces = len(progress_message) * "\b"
-
-            if graph == -1:
-                continue
-            else:
-                final_graph = graph
-                break
-
-    return final_graph
\ No newline at end of file
+    find_with_perm = partial(find_klein_b_embedding_with_permutation, edge_order=edge_order)
+    return run_pooled_sweep(find_with_perm, perms, "klein_b", edgeSet, pool, rebuild, checkpoint, resume)
\ No newline at end of file
@@ -6,39 +6,16 @@ strip book embedding of a graph. It is used in GraphManger to see if a graph
 is one page Mobius book embeddable and gives the embedding if it is.
 """
 
-import copy
+from SurfaceGraph import SurfaceGraph
 
-class MobiusGraph():
+class MobiusGraph(SurfaceGraph):
+
+    flipped_types = {"topToBottom": "bottomToTop", "bottomToTop": "topToBottom"}
 
     def __init__(self, perm, edgeSet):
-        self.verts = len(perm)
         self.top_spine = perm
         self.bottom_spine = perm[::-1]
-        self.addedEdges = []
-        self.remainingEdges = edgeSet
-        self.availableEdges = []
-        self.edge_types = ["top", "bottom", "topToBottom", "bottomToTop"]
-
-        self.generate_all_possible_edges()
-
-    def is_possible_to_embedd(self):
-        possible = True
-        for edge in self.remainingEdges:
-            edge_avail = False
-            for edge_type in self.edge_types:
-                if self.is_edge_available((edge, edge_type)):
-                    edge_avail = True
-                    break
-            if edge_avail == False:
-                possible = False
-                break
-        return possible
-
-    def is_graph_placed(self):
-        if len(self.remainingEdges) == 0:
-            return True
-        else:
-            return False
+        super().__init__(perm, edgeSet, ["top", "bottom", "topToBottom", "bottomToTop"])
 
     def __str__(self):
         pretty_print = str(self.top_spine)
@@ -63,9 +40,7 @@ class MobiusGraph():
                 j = temp
 
             if (i, j) in self.remainingEdges:
-                self.addedEdges.append(((i, j), "top"))
-                self.remainingEdges.remove((i, j))
-                self.remove_edge_from_available((i, j))
+                self.add_placed_edge(((i, j), "top"), free=True)
 
         i = self.top_spine[0]
         j = self.bottom_spine[0]
@@ -74,43 +49,7 @@ class MobiusGraph():
             i = j
             j = temp
         if (i, j) in self.remainingEdges:
-            self.addedEdges.append(((i, j), "topToBottom"))
-            self.remainingEdges.remove((i, j))
-            self.remove_edge_from_available((i,j))
-
-    def generate_all_possible_edges(self):
-        for vert in range(1, self.verts):
-            for other in range(vert + 1, self.verts + 1):
-                self.availableEdges.append(((vert, other), "top"))
-                self.availableEdges.append(((vert, other), "bottom"))
-                self.availableEdges.append(((vert, other), "topToBottom"))
-                self.availableEdges.append(((vert, other), "bottomToTop"))
-
-    def remove_edge_from_available(self, removed_edge):
-        new_edge_copy = self.availableEdges.copy()
-        for edge in self.availableEdges:
-            if edge[0] == removed_edge:
-                new_edge_copy.remove(edge)
-        self.availableEdges = new_edge_copy
-
-    def remove_typed_edge(self, remove_edge):
-        new_edge_copy = self.availableEdges.copy()
-        removed_edge = remove_edge[0]
-        edge_type = remove_edge[1]
-
-        if removed_edge[0] > removed_edge[1]:
-            print("WARNING: First vertex given larger than second")
-
-        for edge in self.availableEdges:
-            if edge[0] == removed_edge and edge[1] == edge_type:
-                new_edge_copy.remove(edge)
-        self.availableEdges = new_edge_copy
-
-    def is_edge_available(self, edge):
-        for avail_edge in self.availableEdges:
-            if edge[0] == avail_edge[0] and edge[1] == avail_edge[1]:
-                return True
-        return False
+            self.add_placed_edge(((i, j), "topToBottom"), free=True)
 
     def place_edge(self, a, b, edge_type):
         if edge_type not in self.edge_types:
@@ -121,19 +60,18 @@ class MobiusGraph():
             print("edge is not available")
             return -1
 
-        self.addedEdges.append(edge)
-        if edge[0] in self.remainingEdges:
-            self.remainingEdges.remove(edge[0])
-        self.remove_edge_from_available(edge[0])
+        self.add_placed_edge(edge)
 
+    def add_blocked_edges(self, placed_edge):
+        edge_type = placed_edge[1]
         if edge_type == "top":
-            self.add_blocked_edges_top(edge)
+            self.add_blocked_edges_top(placed_edge)
         if edge_type == "bottom":
-            self.add_blocked_edges_bottom(edge)
+            self.add_blocked_edges_bottom(placed_edge)
         if edge_type == "topToBottom":
-            self.add_blocked_edges_top_to_bottom(edge)
+            self.add_blocked_edges_top_to_bottom(placed_edge)
         if edge_type == "bottomToTop":
-            self.add_blocked_edges_bottom_to_top(edge)
+            self.add_blocked_edges_bottom_to_top(placed_edge)
 
     def add_blocked_edges_top(self, placed_edge):
         edge = placed_edge[0]
@@ -276,18 +214,3 @@ class MobiusGraph():
                     self.remove_typed_edge(((bottom_left, top_right), "bottomToTop"))
                 else:
                     self.remove_typed_edge(((top_right, bottom_left), "topToBottom"))
-
-    def get_available_edges(self, edge):
-        edges = []
-        for avail_edge in self.availableEdges:
-            if avail_edge[0] == edge:
-                edges.append(avail_edge)
-        return edges
-
-    def copy(self):
-        graph2 = copy.deepcopy(self)
-        return graph2
-
-            
-
-    
\ No newline at end of file
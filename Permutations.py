@@ -3,11 +3,16 @@
 
 This file contains the functions create and store permuations 
 of numbers 1 - n. These permuations are then used with GraphManager
-to search for one-page book embeddings of graphs.
+to search for one-page book embeddings of graphs. The automorphisms of a
+graph are found here too, to skip orderings that are relabellings of
+each other.
 """
 
 import os
+import itertools
 from copy import copy
+from array import array
+from math import factorial
 PERM_LOCATION = "Permutations"
 
 def find_and_remove_flip(line, lines):
@@ -82,6 +87,258 @@ def remove_dihedral_elements(perms):
     perms = list(perms_dict.values())
     return perms
 
+def generate_dihedral_perms(num_elements):
+    """Yields one ordering of 1 - n for every class of orderings that are
+    rotations or reflections of each other, without storing any of them.
+    Rotations are removed by keeping 1 first, and reflections by keeping 2
+    before n.
+    """
+    if num_elements < 3:
+        yield list(range(1, num_elements + 1))
+        return
+    for rest in itertools.permutations(range(2, num_elements + 1)):
+        if rest.index(2) < rest.index(num_elements):
+            yield [1] + list(rest)
+
+def count_dihedral_perms(num_elements):
+    if num_elements < 3:
+        return 1
+    return factorial(num_elements - 1) // 2
+
+class DihedralPerms():
+    """The orderings of generate_dihedral_perms as a sequence that can be
+    looped over more than once and knows its length.
+    """
+
+    def __init__(self, num_elements):
+        self.num_elements = num_elements
+
+    def __iter__(self):
+        return generate_dihedral_perms(self.num_elements)
+
+    def __len__(self):
+        return count_dihedral_perms(self.num_elements)
+
+def get_dihedral_form(perm):
+    """Rotates and reflects a spine ordering into the form generated by
+    generate_dihedral_perms.
+    """
+    if len(perm) < 3:
+        return sorted(perm)
+    start = perm.index(1)
+    rest = perm[start + 1:] + perm[:start]
+    if rest.index(2) > rest.index(len(perm)):
+        rest.reverse()
+    return [1] + rest
+
+def rank_dihedral_perm(perm):
+    """Numbers an ordering that starts with 1 by the position of the rest of
+    it among the orderings of 2 - n, from 0 to (n-1)! - 1.
+    """
+    rank = 0
+    rest = perm[1:]
+    for i in range(len(rest)):
+        smaller = 0
+        for later in rest[i + 1:]:
+            if later < rest[i]:
+                smaller += 1
+        rank += smaller * factorial(len(rest) - i - 1)
+    return rank
+
+def unrank_dihedral_perm(rank, num_elements):
+    """Gives the ordering starting with 1 that rank_dihedral_perm numbers
+    rank.
+    """
+    rest = list(range(2, num_elements + 1))
+    perm = [1]
+    for i in range(len(rest) - 1, -1, -1):
+        index = rank // factorial(i)
+        rank = rank % factorial(i)
+        perm.append(rest.pop(index))
+    return perm
+
+def generate_orbit_perms(num_elements, generators):
+    """Yields one ordering of generate_dihedral_perms for every orbit of
+    orderings under relabelling by the given vertex maps combined with
+    rotations and reflections. After each ordering is yielded, its whole orbit
+    is marked as seen, which takes one byte per ordering of 2 - n.
+    """
+    if num_elements < 3 or len(generators) == 0:
+        yield from generate_dihedral_perms(num_elements)
+        return
+
+    seen = bytearray(factorial(num_elements - 1))
+    for perm in generate_dihedral_perms(num_elements):
+        rank = rank_dihedral_perm(perm)
+        if seen[rank]:
+            continue
+        seen[rank] = 1
+        yield perm
+
+        to_visit = [perm]
+        while len(to_visit) > 0:
+            orbit_perm = to_visit.pop()
+            for generator in generators:
+                image = get_dihedral_form([generator[vert] for vert in orbit_perm])
+                rank = rank_dihedral_perm(image)
+                if not seen[rank]:
+                    seen[rank] = 1
+                    to_visit.append(image)
+
+class OrbitPerms():
+    """The orderings of generate_orbit_perms as a sequence that can be looped
+    over more than once. Without generators its length is the number of
+    dihedral orderings. Otherwise length stays None until len is taken,
+    which walks the orbits once and keeps the rank of every ordering found,
+    8 bytes for each orbit. Later loops unrank those instead of walking the
+    orbits again.
+    """
+
+    def __init__(self, num_elements, generators):
+        self.num_elements = num_elements
+        self.generators = generators
+        self.length = None
+        self.ranks = None
+        if num_elements < 3 or len(generators) == 0:
+            self.length = count_dihedral_perms(num_elements)
+
+    def __iter__(self):
+        if self.ranks != None:
+            return (unrank_dihedral_perm(rank, self.num_elements) for rank in self.ranks)
+        return generate_orbit_perms(self.num_elements, self.generators)
+
+    def __len__(self):
+        if self.length == None:
+            self.ranks = array("q", self.generate_ranks())
+            self.length = len(self.ranks)
+        return self.length
+
+    def generate_ranks(self):
+        """Yields the rank_dihedral_perm of every ordering, in order."""
+        if self.ranks != None:
+            yield from self.ranks
+        else:
+            for perm in self:
+                yield rank_dihedral_perm(perm)
+
+def get_adjacency(edgeSet, numVertices):
+    adjacency = {vert: set() for vert in range(1, numVertices + 1)}
+    for edge in edgeSet:
+        adjacency[edge[0]].add(edge[1])
+        adjacency[edge[1]].add(edge[0])
+    return adjacency
+
+def refine_colours(adjacency, colours):
+    """Splits vertex colour classes by the colours of their neighbours until no
+    class splits any further. New colours only depend on the old colours, so
+    two vertex orders of the same graph refine alike. Returns the refined
+    colours and the sorted vertex signatures of every round.
+    """
+    trace = []
+    num_colours = len(set(colours.values()))
+    while True:
+        signatures = {}
+        for vert in adjacency:
+            neighbour_colours = tuple(sorted(colours[other] for other in adjacency[vert]))
+            signatures[vert] = (colours[vert], neighbour_colours)
+        ordered = sorted(signatures.values())
+        trace.append(ordered)
+
+        new_colour = {}
+        for signature in ordered:
+            if signature not in new_colour:
+                new_colour[signature] = len(new_colour)
+        colours = {vert: new_colour[signatures[vert]] for vert in adjacency}
+        if len(new_colour) == num_colours:
+            return colours, trace
+        num_colours = len(new_colour)
+
+def get_colour_classes(colours):
+    classes = {}
+    for vert in sorted(colours):
+        classes.setdefault(colours[vert], []).append(vert)
+    return [classes[colour] for colour in sorted(classes)]
+
+def find_automorphism(adjacency, fixed):
+    """Searches for an automorphism that maps every (vertex, image) pair in
+    fixed, by individualising the pairs and refining both colourings.
+    Returns the automorphism as a dict, or None.
+    """
+    colours = {vert: 0 for vert in adjacency}
+    image_colours = {vert: 0 for vert in adjacency}
+    for i in range(len(fixed)):
+        colours[fixed[i][0]] = i + 1
+        image_colours[fixed[i][1]] = i + 1
+    colours, trace = refine_colours(adjacency, colours)
+    image_colours, image_trace = refine_colours(adjacency, image_colours)
+    if trace != image_trace:
+        return None
+
+    classes = get_colour_classes(colours)
+    image_classes = get_colour_classes(image_colours)
+    for i in range(len(classes)):
+        if len(classes[i]) > 1:
+            vert = classes[i][0]
+            for image in image_classes[i]:
+                automorphism = find_automorphism(adjacency, fixed + [(vert, image)])
+                if automorphism != None:
+                    return automorphism
+            return None
+
+    automorphism = {classes[i][0]: image_classes[i][0] for i in range(len(classes))}
+    for vert in adjacency:
+        for other in adjacency[vert]:
+            if automorphism[other] not in adjacency[automorphism[vert]]:
+                return None
+    return automorphism
+
+def get_automorphism_generators(edgeSet, numVertices):
+    """Finds a generating set of the automorphism group of a graph. First a
+    base of vertices is picked by individualising the first vertex of the
+    first colour class that has more than one vertex, until every class has
+    one. Then, from the last base vertex to the first, an automorphism fixing
+    the earlier base vertices is searched for every vertex of the base
+    vertex's class that is not yet in its orbit.
+    """
+    adjacency = get_adjacency(edgeSet, numVertices)
+    base = []
+    base_cells = []
+    while True:
+        colours = {vert: 0 for vert in adjacency}
+        for i in range(len(base)):
+            colours[base[i]] = i + 1
+        colours, trace = refine_colours(adjacency, colours)
+        cells = [cell for cell in get_colour_classes(colours) if len(cell) > 1]
+        if len(cells) == 0:
+            break
+        base.append(cells[0][0])
+        base_cells.append(cells[0])
+
+    generators = []
+    for level in range(len(base) - 1, -1, -1):
+        vert = base[level]
+        fixed = [(base_vert, base_vert) for base_vert in base[:level]]
+        orbit = get_orbit(vert, generators)
+        for image in base_cells[level]:
+            if image in orbit:
+                continue
+            automorphism = find_automorphism(adjacency, fixed + [(vert, image)])
+            if automorphism != None:
+                generators.append(automorphism)
+                orbit = get_orbit(vert, generators)
+    return generators
+
+def get_orbit(vert, generators):
+    orbit = {vert}
+    to_visit = [vert]
+    while len(to_visit) > 0:
+        orbit_vert = to_visit.pop()
+        for generator in generators:
+            if generator[orbit_vert] not in orbit:
+                orbit.add(generator[orbit_vert])
+                to_visit.append(generator[orbit_vert])
+    return orbit
+
 # Python program to print all permutations with
 # duplicates allowed
 def toString(List):
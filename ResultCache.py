@@ -0,0 +1,146 @@
+"""ResultCache.py
+@author lmartin5
+
+This file contains the result cache used by GraphManager. It is an SQLite
+store of the result of every sweep, keyed by the surface, the number of
+vertices and the edges of the graph under a canonical labelling, so that a
+graph is found again under any relabelling. Embeddings are stored as a spine
+and typed edges in the canonical labels, and a graph that does not embed as
+-1 with the proof of it. Book results are kept for each number of pages.
+"""
+
+import json
+import sqlite3
+import Permutations
+import SurfaceGraph
+from BookEmbedding import BookEmbedding
+
+# connection to the result cache, while one is open
+result_cache = None
+
+def open_result_cache(path):
+    """Opens the result cache at path, making it if needed. While it is open
+    every sweep looks up the result stored for its graph and surface before
+    any search, and stores the result of its search. Graphs are matched up to
+    relabelling through get_canonical_labelling, and embeddings stored with
+    the canonical labels.
+    """
+    global result_cache
+    close_result_cache()
+    result_cache = sqlite3.connect(path)
+    result_cache.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, spine TEXT, edges TEXT, "
+                         "pages INTEGER, proof TEXT, seconds REAL)")
+    result_cache.commit()
+
+def close_result_cache():
+    global result_cache
+    if result_cache != None:
+        result_cache.close()
+        result_cache = None
+
+def get_result_key(edgeSet, surface, vertices):
+    labelling, edges = get_canonical_labelling(edgeSet, vertices)
+    return get_surface_key(surface, vertices, edges), labelling
+
+def get_surface_key(surface, vertices, edges):
+    """Key of the result for surface of a graph whose canonical edges are
+    edges, for looking up one graph on several surfaces or page counts.
+    """
+    return json.dumps([surface, vertices, edges])
+
+def look_up_result(key, labelling, surface_class, edgeSet):
+    """Returns the result stored under key, with the embedding placed again
+    on edgeSet in a graph of surface_class, or None when there is none.
+    """
+    row = result_cache.execute("SELECT spine, edges, pages FROM results WHERE key = ?", (key,)).fetchone()
+    if row == None:
+        return None
+    if row[0] == None:
+        return -1
+    unlabel = {label: vert for vert, label in labelling.items()}
+    args = (row[2],) if row[2] != None else ()
+    graph = surface_class([unlabel[label] for label in json.loads(row[0])], edgeSet.copy(), *args)
+    graph.place_free_edges()
+    typed_edges = [((edge[0], edge[1]), edge[2]) for edge in json.loads(row[1])]
+    for edge in SurfaceGraph.relabel_typed_edges(typed_edges, unlabel, graph.flipped_types):
+        if edge[0] in graph.remainingEdges:
+            if not graph.is_edge_available(edge):
+                return None
+            graph.place_edge(edge[0][0], edge[0][1], edge[1])
+    if not graph.is_graph_placed():
+        return None
+    return graph
+
+def store_result(key, labelling, graph, proof, seconds):
+    spine = None
+    edges = None
+    pages = None
+    if graph != -1:
+        if isinstance(graph, BookEmbedding):
+            spine = graph.spine
+            pages = graph.numPages
+        else:
+            spine = graph.top_spine
+        spine = json.dumps([labelling[vert] for vert in spine])
+        edges = json.dumps([[edge[0], edge[1], edge_type] for edge, edge_type in
+                            SurfaceGraph.relabel_typed_edges(graph.addedEdges, labelling, graph.flipped_types)])
+    result_cache.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                         (key, spine, edges, pages, proof, seconds))
+    result_cache.commit()
+
+def individualise(colours, vert):
+    colours = {other: 2 * colour + 1 for other, colour in colours.items()}
+    colours[vert] -= 1
+    return colours
+
+def get_canonical_labelling(edgeSet, numVertices):
+    """Finds a canonical labelling of a graph: vertices get labels 1 - n so
+    that any two relabellings of the same graph get the same relabelled
+    edges. Colour classes are split by individualising their vertices one
+    at a time and refining, and the labelling with the smallest sorted
+    edges among the discrete colourings reached is taken. Two colourings
+    giving the same edges differ by an automorphism, which is used to skip
+    vertices in the same orbit as one already individualised. Returns the
+    labelling as a dict and the relabelled sorted edges.
+    """
+    adjacency = Permutations.get_adjacency(edgeSet, numVertices)
+    search = {"first": None, "best": None, "generators": []}
+    colours = {vert: 0 for vert in adjacency}
+    search_labellings(adjacency, edgeSet, colours, [], search)
+    return search["best"][1], search["best"][2]
+
+def search_labellings(adjacency, edgeSet, colours, path, search):
+    colours, trace = Permutations.refine_colours(adjacency, colours)
+    classes = Permutations.get_colour_classes(colours)
+    cells = [cell for cell in classes if len(cell) > 1]
+    if len(cells) == 0:
+        labelling = {classes[i][0]: i + 1 for i in range(len(classes))}
+        edges = tuple(sorted(tuple(sorted((labelling[edge[0]], labelling[edge[1]]))) for edge in edgeSet))
+        leaf = (path, labelling, edges)
+        if search["first"] == None:
+            search["first"] = leaf
+            search["best"] = leaf
+            return None
+        for other in [search["first"], search["best"]]:
+            if edges == other[2]:
+                unlabel = {label: vert for vert, label in other[1].items()}
+                search["generators"].append({vert: unlabel[labelling[vert]] for vert in labelling})
+                depth = 0
+                while path[depth] == other[0][depth]:
+                    depth += 1
+                return depth
+        if edges < search["best"][2]:
+            search["best"] = leaf
+        return None
+
+    explored = []
+    for vert in cells[0]:
+        fixing = [generator for generator in search["generators"]
+                  if all(generator[path_vert] == path_vert for path_vert in path)]
+        if any(vert in Permutations.get_orbit(other, fixing) for other in explored):
+            continue
+        explored.append(vert)
+        depth = search_labellings(adjacency, edgeSet, individualise(colours, vert), path + [vert], search)
+        if depth != None and depth < len(path):
+            return depth
+    return None
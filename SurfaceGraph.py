@@ -0,0 +1,324 @@
+"""SurfaceGraph.py
+@author lmartin5
+
+This file contains the SurfaceGraph class. It holds the edges that are still
+available to be placed in a book embedding, and is the parent class of
+BookEmbedding, MobiusGraph, TorusGraph, KleinGraph and KleinGraphB.
+
+Availability is stored as one integer bitmask per edge type, with one bit for
+every pair of spine positions (i, j), i < j. Removing, looking up or listing the
+available placements of an edge are then single bit operations instead of scans
+over a list of ((a, b), type) tuples.
+
+Which placements an edge blocks only depends on the spine positions of its
+endpoints, not on the vertex labels. The blocked placements of every
+(position pair, edge type) are compiled once per surface and number of
+vertices by running the add_blocked_edges method of the surface on the spine
+[1, 2, ..., n], so placing an edge is one mask AND per edge type.
+"""
+
+import copy
+
+pair_index_cache = {}
+blocking_table_cache = {}
+
+def get_pair_index(num_verts):
+    """Maps each position pair (i, j), 1 <= i < j <= num_verts, to its bit.
+    The map is shared by every graph with the same number of vertices.
+    """
+    if num_verts not in pair_index_cache:
+        pair_index = {}
+        for vert in range(1, num_verts):
+            for other in range(vert + 1, num_verts + 1):
+                pair_index[(vert, other)] = len(pair_index)
+        pair_index_cache[num_verts] = pair_index
+    return pair_index_cache[num_verts]
+
+def get_blocking_table(graph):
+    """Returns the blocking table for the surface and number of vertices of graph.
+    table[bit][type] holds, for every edge type, the mask of placements left
+    available after an edge of that type is placed on that position pair.
+    """
+    key = (type(graph), graph.verts, tuple(graph.edge_types))
+    if key not in blocking_table_cache:
+        position_graph = graph.new_position_graph()
+        end_pair = (1, graph.verts)
+        table = []
+        for pair in position_graph.pair_index:
+            pair_blocks = []
+            for edge_type in position_graph.edge_types:
+                position_graph.generate_all_possible_edges()
+                # free edges block nothing, and some surfaces warn when asked
+                if pair != end_pair or edge_type not in position_graph.free_end_types:
+                    position_graph.add_blocked_edges((pair, edge_type))
+                pair_blocks.append(tuple(position_graph.available_masks))
+            table.append(pair_blocks)
+        blocking_table_cache[key] = table
+    return blocking_table_cache[key]
+
+def relabel_typed_edges(typed_edges, labelling, flipped_types):
+    """Relabels the placed edges of an embedding, keeping the smaller label
+    first. Edge types that depend on the order of the endpoints are flipped
+    when relabelling reverses it.
+    """
+    relabelled = []
+    for edge, edge_type in typed_edges:
+        a, b = labelling[edge[0]], labelling[edge[1]]
+        if a > b:
+            a, b = b, a
+            edge_type = flipped_types.get(edge_type, edge_type)
+        relabelled.append(((a, b), edge_type))
+    return relabelled
+
+class SurfaceGraph():
+
+    # edge type an edge becomes when its endpoints are listed in the other
+    # order, for types that are not symmetric
+    flipped_types = {}
+
+    # edge types that join the first and last spine positions as a free edge,
+    # which blocks no other placements
+    free_end_types = ()
+
+    def __init__(self, perm, edgeSet, edge_types):
+        self.verts = len(perm)
+        self.addedEdges = []
+        self.remainingEdges = edgeSet
+        self.edge_types = edge_types
+        self.type_index = {edge_type: i for i, edge_type in enumerate(edge_types)}
+        self.flipped_index = [self.type_index[self.flipped_types.get(edge_type, edge_type)]
+                              for edge_type in edge_types]
+        self.pair_index = get_pair_index(self.verts)
+        self.blocking_table = blocking_table_cache.get((type(self), self.verts, tuple(edge_types)))
+        self.available_masks = []
+        self.trail = []
+
+        # relabels every vertex pair into position space
+        position = {vert: i + 1 for i, vert in enumerate(perm)}
+        self.edge_bits = {}
+        self.bit_edges = {}
+        for a in sorted(position):
+            for b in sorted(position):
+                if a < b:
+                    i, j = position[a], position[b]
+                    if i < j:
+                        self.edge_bits[(a, b)] = (self.pair_index[(i, j)], False)
+                    else:
+                        self.edge_bits[(a, b)] = (self.pair_index[(j, i)], True)
+                    self.bit_edges[self.edge_bits[(a, b)][0]] = (a, b)
+
+        # number of available placements of every remaining edge, kept up to
+        # date as placements are blocked
+        self.option_counts = {}
+        self.remaining_mask = 0
+        self.unplaceable_edges = 0
+
+        self.generate_all_possible_edges()
+
+    @property
+    def availableEdges(self):
+        edges = []
+        for pair in self.edge_bits:
+            edges.extend(self.get_available_edges(pair))
+        return edges
+
+    def new_position_graph(self):
+        return type(self)(list(range(1, self.verts + 1)), [])
+
+    def get_type_index(self, edge_type, flipped):
+        i = self.type_index.get(edge_type)
+        if flipped and i != None:
+            i = self.flipped_index[i]
+        return i
+
+    def is_possible_to_embedd(self):
+        return self.unplaceable_edges == 0
+
+    def is_graph_placed(self):
+        if len(self.remainingEdges) == 0:
+            return True
+        else:
+            return False
+
+    def generate_all_possible_edges(self):
+        all_pairs = (1 << len(self.pair_index)) - 1
+        self.available_masks = [all_pairs for edge_type in self.edge_types]
+        self.count_remaining_options()
+
+    def count_remaining_options(self):
+        """Recounts the available placements of every remaining edge."""
+        self.option_counts = {}
+        self.remaining_mask = 0
+        self.unplaceable_edges = 0
+        for edge in self.remainingEdges:
+            count = self.count_available_edges(edge)
+            self.option_counts[edge] = count
+            if count == 0:
+                self.unplaceable_edges += 1
+            if edge in self.edge_bits:
+                self.remaining_mask |= 1 << self.edge_bits[edge][0]
+
+    def update_option_counts(self, old_masks):
+        """Lowers the counts of the remaining edges that lost placements since
+        the availability masks were old_masks. The edges lowered are recorded
+        on the last trail entry, so undo_placed_edges can raise them again.
+        """
+        lowered = self.trail[-1][3] if len(self.trail) > 0 else None
+        for i in range(len(old_masks)):
+            lost = old_masks[i] & ~self.available_masks[i] & self.remaining_mask
+            while lost:
+                low = lost & -lost
+                lost ^= low
+                edge = self.bit_edges[low.bit_length() - 1]
+                self.option_counts[edge] -= 1
+                if self.option_counts[edge] == 0:
+                    self.unplaceable_edges += 1
+                if lowered != None:
+                    lowered.append(edge)
+
+    def remove_edge_from_available(self, removed_edge):
+        bit = self.edge_bits.get(removed_edge)
+        if bit == None:
+            return
+        old_masks = self.available_masks.copy()
+        keep = ~(1 << bit[0])
+        for i in range(len(self.available_masks)):
+            self.available_masks[i] &= keep
+        self.update_option_counts(old_masks)
+
+    def remove_typed_edge(self, remove_edge):
+        removed_edge = remove_edge[0]
+        edge_type = remove_edge[1]
+
+        if removed_edge[0] > removed_edge[1]:
+            print("WARNING: First vertex given larger than second")
+
+        bit = self.edge_bits.get(removed_edge)
+        if bit == None:
+            return
+        i = self.get_type_index(edge_type, bit[1])
+        if i == None or not self.available_masks[i] >> bit[0] & 1:
+            return
+        self.available_masks[i] &= ~(1 << bit[0])
+        if removed_edge in self.option_counts:
+            self.option_counts[removed_edge] -= 1
+            if self.option_counts[removed_edge] == 0:
+                self.unplaceable_edges += 1
+            if len(self.trail) > 0:
+                self.trail[-1][3].append(removed_edge)
+
+    def is_edge_available(self, edge):
+        bit = self.edge_bits.get(edge[0])
+        if bit == None:
+            return False
+        i = self.get_type_index(edge[1], bit[1])
+        if i == None:
+            return False
+        return self.available_masks[i] >> bit[0] & 1 == 1
+
+    def get_available_edges(self, edge):
+        bit = self.edge_bits.get(edge)
+        if bit == None:
+            return []
+        edges = []
+        for edge_type in self.edge_types:
+            if self.available_masks[self.get_type_index(edge_type, bit[1])] >> bit[0] & 1:
+                edges.append((edge, edge_type))
+        return edges
+
+    def count_available_edges(self, edge):
+        if edge in self.option_counts:
+            return self.option_counts[edge]
+        bit = self.edge_bits.get(edge)
+        if bit == None:
+            return 0
+        count = 0
+        for mask in self.available_masks:
+            count += mask >> bit[0] & 1
+        return count
+
+    def place_forced_edges(self):
+        """Places every remaining edge that has a single available placement,
+        until none are left. Returns False as soon as a remaining edge has no
+        available placement, and True otherwise.
+        """
+        while self.unplaceable_edges == 0:
+            forced_edge = None
+            for edge, count in self.option_counts.items():
+                if count == 1:
+                    forced_edge = edge
+                    break
+            if forced_edge == None:
+                return True
+
+            edge_type = self.get_available_edges(forced_edge)[0][1]
+            self.place_edge(forced_edge[0], forced_edge[1], edge_type)
+        return False
+
+    def apply_blocked_edges(self, placed_edge):
+        if self.blocking_table == None:
+            self.blocking_table = get_blocking_table(self)
+
+        bit, flipped = self.edge_bits[placed_edge[0]]
+        blocks = self.blocking_table[bit][self.get_type_index(placed_edge[1], flipped)]
+        old_masks = self.available_masks.copy()
+        for i in range(len(self.available_masks)):
+            self.available_masks[i] &= blocks[i]
+        self.update_option_counts(old_masks)
+
+    def add_placed_edge(self, placed_edge, free=False):
+        """Adds an edge that has already been checked as available, and records
+        on the trail what it changed so undo_placed_edges can take it back:
+        the availability masks before it, the edge, its place and count in
+        the remaining edges, and the edges whose counts it lowered. Free
+        edges, such as edges between neighbouring spine vertices, block no
+        other placements.
+        """
+        edge = placed_edge[0]
+        removed = None
+        if edge in self.remainingEdges:
+            index = self.remainingEdges.index(edge)
+            del self.remainingEdges[index]
+            count = self.option_counts.pop(edge)
+            if count == 0:
+                self.unplaceable_edges -= 1
+            self.remaining_mask &= ~(1 << self.edge_bits[edge][0])
+            removed = (index, count)
+        self.trail.append((tuple(self.available_masks), edge, removed, []))
+        self.addedEdges.append(placed_edge)
+
+        self.remove_edge_from_available(edge)
+        if not free:
+            self.apply_blocked_edges(placed_edge)
+
+    def get_trail_length(self):
+        return len(self.trail)
+
+    def undo_placed_edges(self, trail_length):
+        """Takes back every edge placed since the trail had trail_length
+        entries, replaying the changes of each in reverse.
+        """
+        while len(self.trail) > trail_length:
+            masks, edge, removed, lowered = self.trail.pop()
+            self.addedEdges.pop()
+            self.available_masks = list(masks)
+            for lowered_edge in lowered:
+                if self.option_counts[lowered_edge] == 0:
+                    self.unplaceable_edges -= 1
+                self.option_counts[lowered_edge] += 1
+            if removed != None:
+                index, count = removed
+                self.remainingEdges.insert(index, edge)
+                self.option_counts[edge] = count
+                if count == 0:
+                    self.unplaceable_edges += 1
+                self.remaining_mask |= 1 << self.edge_bits[edge][0]
+
+    def copy(self):
+        graph2 = copy.copy(self)
+        graph2.addedEdges = self.addedEdges.copy()
+        graph2.remainingEdges = self.remainingEdges.copy()
+        graph2.available_masks = self.available_masks.copy()
+        graph2.option_counts = self.option_counts.copy()
+        graph2.trail = [entry[:3] + (entry[3].copy(),) for entry in self.trail]
+        return graph2
@@ -6,39 +6,19 @@ This file contains the TorusGraph class. It represents a one-page Torus
 is one page Torus book embeddable and gives the embedding if it is.
 """
 
-import copy
+from SurfaceGraph import SurfaceGraph
 
-class TorusGraph():
+class TorusGraph(SurfaceGraph):
+
+    flipped_types = {"topToBottom": "bottomToTop", "bottomToTop": "topToBottom",
+                     "ttbLeft": "bttRight", "bttRight": "ttbLeft",
+                     "ttbRight": "bttLeft", "bttLeft": "ttbRight"}
+    free_end_types = ("topWrap", "bottomWrap")
 
     def __init__(self, perm, edgeSet):
-        self.verts = len(perm)
         self.top_spine = perm
         self.bottom_spine = perm.copy()
-        self.addedEdges = []
-        self.remainingEdges = edgeSet
-        self.availableEdges = []
-        self.edge_types = ["top", "bottom", "topToBottom", "bottomToTop", "topWrap", "bottomWrap", "ttbLeft", "ttbRight", "bttLeft", "bttRight"]
-
-        self.generate_all_possible_edges()
-
-    def is_possible_to_embedd(self):
-        possible = True
-        for edge in self.remainingEdges:
-            edge_avail = False
-            for edge_type in self.edge_types:
-                if self.is_edge_available((edge, edge_type)):
-                    edge_avail = True
-                    break
-            if edge_avail == False:
-                possible = False
-                break
-        return possible
-
-    def is_graph_placed(self):
-        if len(self.remainingEdges) == 0:
-            return True
-        else:
-            return False
+        super().__init__(perm, edgeSet, ["top", "bottom", "topToBottom", "bottomToTop", "topWrap", "bottomWrap", "ttbLeft", "ttbRight", "bttLeft", "bttRight"])
 
     def __str__(self):
         pretty_print = str(self.top_spine)
@@ -63,9 +43,7 @@ class TorusGraph():
                 j = temp
 
             if (i, j) in self.remainingEdges:
-                self.addedEdges.append(((i, j), "top"))
-                self.remainingEdges.remove((i, j))
-                self.remove_edge_from_available((i, j))
+                self.add_placed_edge(((i, j), "top"), free=True)
 
         i = self.top_spine[0]
         j = self.top_spine[self.verts - 1]
@@ -74,41 +52,7 @@ class TorusGraph():
             i = j
             j = temp
         if (i, j) in self.remainingEdges:
-            self.addedEdges.append(((i, j), "topWrap"))
-            self.remainingEdges.remove((i, j))
-            self.remove_edge_from_available((i,j))
-
-    def generate_all_possible_edges(self):
-        for vert in range(1, self.verts):
-            for other in range(vert + 1, self.verts + 1):
-                for edgeType in self.edge_types:
-                    self.availableEdges.append(((vert, other), edgeType))
-
-    def remove_edge_from_available(self, removed_edge):
-        new_edge_copy = self.availableEdges.copy()
-        for edge in self.availableEdges:
-            if edge[0] == removed_edge:
-                new_edge_copy.remove(edge)
-        self.availableEdges = new_edge_copy
-
-    def remove_typed_edge(self, remove_edge):
-        new_edge_copy = self.availableEdges.copy()
-        removed_edge = remove_edge[0]
-        edge_type = remove_edge[1]
-
-        if removed_edge[0] > removed_edge[1]:
-            print("WARNING: First vertex given larger than second")
-
-        for edge in self.availableEdges:
-            if edge[0] == removed_edge and edge[1] == edge_type:
-                new_edge_copy.remove(edge)
-        self.availableEdges = new_edge_copy
-
-    def is_edge_available(self, edge):
-        for avail_edge in self.availableEdges:
-            if edge[0] == avail_edge[0] and edge[1] == avail_edge[1]:
-                return True
-        return False
+            self.add_placed_edge(((i, j), "topWrap"), free=True)
 
     def place_edge(self, a, b, edge_type):
         if edge_type not in self.edge_types:
@@ -119,31 +63,30 @@ class TorusGraph():
             print("edge is not available")
             return -1
 
-        self.addedEdges.append(edge)
-        if edge[0] in self.remainingEdges:
-            self.remainingEdges.remove(edge[0])
-        self.remove_edge_from_available(edge[0])
+        self.add_placed_edge(edge)
 
+    def add_blocked_edges(self, placed_edge):
+        edge_type = placed_edge[1]
         if edge_type == "top":
-            self.add_blocked_edges_top(edge)
+            self.add_blocked_edges_top(placed_edge)
         if edge_type == "bottom":
-            self.add_blocked_edges_bottom(edge)
+            self.add_blocked_edges_bottom(placed_edge)
         if edge_type == "topToBottom":
-            self.add_blocked_edges_top_to_bottom(edge)
+            self.add_blocked_edges_top_to_bottom(placed_edge)
         if edge_type == "bottomToTop":
-            self.add_blocked_edges_bottom_to_top(edge)
+            self.add_blocked_edges_bottom_to_top(placed_edge)
         if edge_type == "topWrap":
-            self.add_blocked_edges_top_wrap(edge)
+            self.add_blocked_edges_top_wrap(placed_edge)
         if edge_type == "bottomWrap":
-            self.add_blocked_edges_bottom_wrap(edge)
+            self.add_blocked_edges_bottom_wrap(placed_edge)
         if edge_type == "ttbLeft":
-            self.add_blocked_edges_ttb_left(edge)
+            self.add_blocked_edges_ttb_left(placed_edge)
         if edge_type == "ttbRight":
-            self.add_blocked_edges_ttb_right(edge)
+            self.add_blocked_edges_ttb_right(placed_edge)
         if edge_type == "bttLeft":
-            self.add_blocked_edges_btt_left(edge)
+            self.add_blocked_edges_btt_left(placed_edge)
         if edge_type == "bttRight":
-            self.add_blocked_edges_btt_right(edge)
+            self.add_blocked_edges_btt_right(placed_edge)
 
     def add_blocked_edges_top(self, placed_edge):
         edge = placed_edge[0]
@@ -946,15 +889,3 @@ class TorusGraph():
                 else:
                     self.remove_typed_edge(((bo, to), "bttRight"))
                     self.remove_typed_edge(((bo, to), "bttLeft"))
-
-
-    def get_available_edges(self, edge):
-        edges = []
-        for avail_edge in self.availableEdges:
-            if avail_edge[0] == edge:
-                edges.append(avail_edge)
-        return edges
-
-    def copy(self):
-        graph2 = copy.deepcopy(self)
-        return graph2
\ No newline at end of file
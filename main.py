@@ -46,12 +46,7 @@ def main():
     
     # graph = GraphManager.find_klein_b_embedding_with_permutation([1, 2, 3, 4, 5, 6, 7, 8], edges)
     
-    Permutations.generate_permutations_to_file(8)
-    perms = Permutations.get_perms_from_file(8)
-    perms = Permutations.remove_dihedral_elements(perms)
-    Permutations.store_permutations(perms, 8, "dihedral_perms_")
-    perms = Permutations.get_perms_from_file(8, "dihedral_perms_")
-    perms = Permutations.strings_to_perms(perms)
+    perms = Permutations.DihedralPerms(8)
 
     # 8 vertex klein ladder
     edges = [(1,2), (1,3), (1,4), (1,6), (1,7), (1,8), 
@@ -2,7 +2,21 @@
 @author lmartin5
 """
 
+import os
+import json
+import pytest
+import itertools
+import functools
+import multiprocessing
 import GraphManager
+import Permutations
+import ResultCache
+import SurfaceGraph
+from KleinGraph import KleinGraph
+from KleinGraphB import KleinGraphB
+from TorusGraph import TorusGraph
+from MobiusGraph import MobiusGraph
+from BookEmbedding import BookEmbedding
 
 k_6 = [(1, 2), (1, 3), (1, 4), (1, 5), (1, 6), (2, 3), (2, 4), (2, 5), (2, 6),
        (3, 4), (3, 5), (3, 6), (4, 5), (4, 6), (5, 6)]
@@ -42,4 +56,552 @@ def assert_correct_edge_set(edge_set, solution_edge_set):
     """
     assert len(edge_set) == len(solution_edge_set)
     for edge in solution_edge_set:
-        assert edge in edge_set
\ No newline at end of file
+        assert edge in edge_set
+
+"""
+Second Set: Testing the Available Edge Store from SurfaceGraph.py
+"""
+def test_available_edge_store():
+    """Test function
+    """
+    graph = KleinGraph([1, 2, 3, 4], [(1, 3)])
+    assert len(graph.availableEdges) == 6 * len(graph.edge_types)
+    assert graph.is_edge_available(((1, 3), "top"))
+
+    graph.remove_typed_edge(((1, 3), "top"))
+    assert not graph.is_edge_available(((1, 3), "top"))
+    assert ((1, 3), "top") not in graph.get_available_edges((1, 3))
+    assert graph.is_possible_to_embedd()
+
+    graph.remove_edge_from_available((1, 3))
+    assert graph.get_available_edges((1, 3)) == []
+    assert not graph.is_possible_to_embedd()
+
+def test_compiled_blocking_matches_spine_blocking():
+    """Test function
+    Placing an edge through the compiled position table blocks the same
+    placements as the surface's own add_blocked_edges on a shuffled spine
+    """
+    for surface in [KleinGraph, KleinGraphB, TorusGraph, MobiusGraph]:
+        for edge_type in surface([1, 2], []).edge_types:
+            compiled = surface([3, 6, 1, 5, 2, 4], [])
+            compiled.apply_blocked_edges(((2, 3), edge_type))
+            direct = surface([3, 6, 1, 5, 2, 4], [])
+            direct.add_blocked_edges(((2, 3), edge_type))
+            assert compiled.availableEdges == direct.availableEdges
+
+def test_compile_blocking_table_quietly(capsys):
+    """Test function
+    The wrap edges between the first and last spine positions are free, so
+    compiling skips them instead of asking the surface to block them
+    """
+    for surface in [KleinGraph, TorusGraph]:
+        graph = surface([1, 2, 3, 4, 5], [])
+        SurfaceGraph.blocking_table_cache.pop((surface, 5, tuple(graph.edge_types)), None)
+        table = SurfaceGraph.get_blocking_table(graph)
+        free_blocks = table[graph.pair_index[(1, 5)]][graph.edge_types.index("topWrap")]
+        assert list(free_blocks) == surface([1, 2, 3, 4, 5], []).available_masks
+    assert capsys.readouterr().out == ""
+
+def test_undo_placed_edges():
+    """Test function
+    """
+    graph = KleinGraph([1, 2, 3, 4, 5], [(1, 3), (2, 4), (3, 5)])
+    available = graph.availableEdges
+    trail_length = graph.get_trail_length()
+
+    graph.place_edge(2, 4, "top")
+    graph.place_edge(1, 3, "bottom")
+    assert graph.remainingEdges == [(3, 5)]
+    assert graph.availableEdges != available
+
+    graph.undo_placed_edges(trail_length)
+    assert graph.remainingEdges == [(1, 3), (2, 4), (3, 5)]
+    assert graph.addedEdges == []
+    assert graph.availableEdges == available
+
+    # the trail keeps what each placement changed, and undo replays it
+    k_6 = GraphManager.create_complete_graph_edge_set(6)
+    graph = TorusGraph([1, 2, 3, 4, 5, 6], k_6.copy())
+    counts = graph.option_counts.copy()
+    graph.place_edge(1, 3, "top")
+    graph.place_edge(2, 5, "bottom")
+    masks, edge, removed, lowered = graph.trail[-1]
+    assert edge == (2, 5)
+    assert removed[0] == k_6.index((2, 5)) - 1
+    assert all(lowered_edge in graph.remainingEdges for lowered_edge in lowered)
+    graph.undo_placed_edges(0)
+    assert graph.remainingEdges == k_6
+    assert graph.option_counts == counts
+    assert graph.is_possible_to_embedd()
+
+
+"""
+Third Set: Testing the Embedding Searches from GraphManager.py
+"""
+def test_find_embedding_with_permutation():
+    """Test function
+    K_7 embeds on the torus but not on the Klein bottle
+    """
+    spine = [1, 2, 3, 4, 5, 6, 7]
+    k_7 = GraphManager.create_complete_graph_edge_set(7)
+
+    graph = GraphManager.find_torus_embedding_with_permutation(spine, k_7.copy())
+    assert graph != -1
+    assert graph.is_graph_placed()
+    assert len(graph.addedEdges) == len(k_7)
+
+    assert GraphManager.find_klein_embedding_with_permutation(spine, k_7.copy()) == -1
+
+    k_5 = GraphManager.create_complete_graph_edge_set(5)
+    assert GraphManager.find_book_embedding_with_permutation(spine[:5], k_5, 2) == -1
+    assert GraphManager.find_book_embedding_with_permutation(spine[:5], k_5, 3) != -1
+
+def test_most_constrained_edge_order():
+    """Test function
+    """
+    spine = [1, 2, 3, 4, 5, 6, 7]
+    k_7 = GraphManager.create_complete_graph_edge_set(7)
+
+    graph = GraphManager.find_torus_embedding_with_permutation(spine, k_7.copy(), edge_order="most_constrained")
+    assert graph != -1
+    assert len(graph.addedEdges) == len(k_7)
+    assert GraphManager.find_klein_embedding_with_permutation(spine, k_7.copy(), edge_order="most_constrained") == -1
+
+def test_place_forced_edges():
+    """Test function
+    """
+    graph = BookEmbedding([1, 2, 3, 4], [(1, 3), (2, 4)], 1)
+    assert not graph.place_forced_edges()
+
+    graph = BookEmbedding([1, 2, 3, 4], [(1, 3), (2, 4)], 2)
+    graph.place_edge(1, 3, 1)
+    assert graph.place_forced_edges()
+    assert graph.addedEdges == [((1, 3), 1), ((2, 4), 2)]
+    assert graph.is_graph_placed()
+
+def test_option_counts():
+    """Test function
+    """
+    graph = BookEmbedding([1, 2, 3, 4], [(1, 3), (2, 4)], 2)
+    assert graph.option_counts == {(1, 3): 2, (2, 4): 2}
+    trail_length = graph.get_trail_length()
+
+    graph.place_edge(1, 3, 1)
+    assert graph.option_counts == {(2, 4): 1}
+    graph.remove_typed_edge(((2, 4), 2))
+    assert graph.option_counts == {(2, 4): 0}
+    assert not graph.is_possible_to_embedd()
+
+    graph.undo_placed_edges(trail_length)
+    assert graph.option_counts == {(1, 3): 2, (2, 4): 2}
+    assert graph.is_possible_to_embedd()
+
+def test_two_page_book_embedding():
+    """Test function
+    """
+    k_4 = GraphManager.create_complete_graph_edge_set(4)
+    assert GraphManager.find_two_page_book_embedding_with_permutation([1, 2, 3, 4], k_4, 1) == -1
+
+    graph = GraphManager.find_two_page_book_embedding_with_permutation([1, 2, 3, 4], k_4)
+    assert graph != -1
+    assert graph.is_graph_placed()
+    assert ((1, 3), 1) in graph.addedEdges
+    assert ((2, 4), 2) in graph.addedEdges
+
+    crossings = GraphManager.get_crossing_edges([1, 2, 3, 4], k_4)
+    assert crossings[(1, 3)] == [(2, 4)]
+    assert crossings[(1, 2)] == []
+
+def test_k_page_book_embedding():
+    """Test function
+    K_n needs ceil(n / 2) pages
+    """
+    k_8 = GraphManager.create_complete_graph_edge_set(8)
+    spine = [1, 2, 3, 4, 5, 6, 7, 8]
+    assert GraphManager.find_book_embedding_with_permutation(spine, k_8, 3) == -1
+
+    graph = GraphManager.find_book_embedding_with_permutation(spine, k_8, 4)
+    assert graph != -1
+    assert graph.is_graph_placed()
+    assert len(graph.addedEdges) == len(k_8)
+
+    crossings = GraphManager.get_crossing_edges(spine, k_8)
+    assert len(GraphManager.find_crossing_clique(crossings)) == 4
+
+def test_edge_bounds():
+    """Test function
+    K_8 has more than 3n edges, K_7 fits 3n but not 3n - 3
+    """
+    k_7 = GraphManager.create_complete_graph_edge_set(7)
+    k_8 = GraphManager.create_complete_graph_edge_set(8)
+    assert GraphManager.exceeds_edge_bound(k_8, "torus")
+    assert not GraphManager.exceeds_edge_bound(k_7, "torus")
+    assert GraphManager.exceeds_edge_bound(k_7, "mobius")
+    assert GraphManager.find_klein_embedding_threaded(k_8, vertices=8) == -1
+
+    # K_7 with a long tail still holds the dense K_7 part
+    tail = k_7 + [(7, 8), (8, 9), (9, 10), (10, 11), (11, 12)]
+    assert GraphManager.exceeds_edge_bound(tail, "mobius")
+    assert GraphManager.get_max_edges("book", 7, 3) == 19
+    assert GraphManager.exceeds_edge_bound(k_7, "book", 3)
+    assert not GraphManager.exceeds_edge_bound(k_7, "book", 4)
+
+def test_book_embedding_by_blocks():
+    """Test function
+    Two K_5 sharing a vertex, with a triangle hung off a bridge
+    """
+    k_5 = GraphManager.create_complete_graph_edge_set(5)
+    edges = k_5 + [(a + 4, b + 4) for a, b in k_5] + [(9, 10), (10, 11), (11, 12), (10, 12)]
+    blocks = GraphManager.get_biconnected_components(edges)
+    assert sorted(len(block) for block in blocks) == [1, 3, 10, 10]
+
+    graph = GraphManager.find_book_embedding(edges, vertices=13)
+    assert graph.numPages == 3
+    assert graph.is_graph_placed()
+    assert len(graph.addedEdges) == len(edges)
+    assert sorted(graph.spine) == list(range(1, 14))
+
+def test_graph_reduction():
+    """Test function
+    K_6 with a path through 7 and 8 back to K_6, a leaf 9 and isolated 10.
+    8 is left with neighbours 1 and 6 after 7 and 9 go, but they are adjacent
+    """
+    edges = GraphManager.create_complete_graph_edge_set(6) + [(1, 7), (7, 8), (6, 8), (8, 9)]
+    kernel_edges, kernel_verts, reductions = GraphManager.reduce_graph(edges, 10)
+    assert kernel_verts == [1, 2, 3, 4, 5, 6, 8]
+    assert (1, 8) in kernel_edges
+    assert ("chain", 7, 1, 8) in reductions
+    assert ("leaf", 9, 8) in reductions
+    assert ("isolated", 10) in reductions
+
+    kernel_edges, kernel_verts, reductions = GraphManager.reduce_graph(edges, 10, contract_chains=False)
+    assert kernel_verts == [1, 2, 3, 4, 5, 6, 7, 8]
+    assert GraphManager.reinsert_reductions([1, 2], [("isolated", 4), ("leaf", 3, 1)]) == [1, 3, 2, 4]
+
+    graph = GraphManager.find_torus_embedding(edges, vertices=10)
+    assert graph != -1
+    assert graph.is_graph_placed()
+    assert sorted(graph.top_spine) == list(range(1, 11))
+
+def test_search_pool_cancellation():
+    """Test function
+    A set cancel event stops the search, and a search pool can be reused
+    """
+    k_7 = GraphManager.create_complete_graph_edge_set(7)
+    cancelled = multiprocessing.Event()
+    cancelled.set()
+    GraphManager.set_cancel_event(cancelled)
+    try:
+        graph = TorusGraph([1, 2, 3, 4, 5, 6, 7], k_7.copy())
+        assert not GraphManager.place_remaining_edges(graph)
+        assert graph.get_trail_length() == 0
+    finally:
+        GraphManager.set_cancel_event(None)
+
+    pool = GraphManager.create_search_pool(1)
+    try:
+        perms = list(Permutations.DihedralPerms(7))
+        # a pool keeps its own cancel event when the one of this process changes
+        GraphManager.set_cancel_event(None)
+        assert GraphManager.find_torus_embedding_threaded(k_7, perms=perms, pool=pool) != -1
+        perm, codes = GraphManager.find_torus_embedding_threaded(k_7, perms=perms, pool=pool, rebuild=False)
+        assert GraphManager.unpack_embedding("torus", perm, k_7, codes).is_graph_placed()
+        assert not GraphManager.is_search_cancelled()
+        assert not GraphManager.get_search_pool(pool)[1].is_set()
+    finally:
+        pool.terminate()
+
+    pool = multiprocessing.Pool(1)
+    try:
+        with pytest.raises(SystemExit):
+            GraphManager.run_pooled_search(str, [1], 1, pool)
+    finally:
+        pool.terminate()
+
+def test_pool_job():
+    """Test function
+    Tasks of a pooled sweep only carry spine ranks
+    """
+    k_7 = GraphManager.create_complete_graph_edge_set(7)
+    find_with_perm = GraphManager.find_torus_embedding_with_permutation
+    perms = Permutations.DihedralPerms(7)
+    job, job_path, tasks = GraphManager.write_pool_job(find_with_perm, perms, "torus", k_7)
+    try:
+        tasks = list(tasks)
+        assert len(tasks) == len(perms)
+        assert Permutations.unrank_dihedral_perm(tasks[5], 7) == list(perms)[5]
+        rank, codes = GraphManager.run_pool_task(job_path, tasks[0])
+        assert rank == tasks[0]
+        assert len(codes) == len(k_7)
+        graph = GraphManager.unpack_embedding("torus", [1, 2, 3, 4, 5, 6, 7], k_7, codes)
+        assert graph.is_graph_placed()
+        assert GraphManager.pack_embedding(graph, k_7) == codes
+
+        found, count, seconds = GraphManager.run_task_chunk(functools.partial(GraphManager.run_pool_task, job_path),
+                                                            tasks[:10])
+        assert found == [(rank, codes)]
+        assert count == 1
+        found, count, seconds = GraphManager.run_task_chunk(functools.partial(GraphManager.run_pool_task, job_path),
+                                                            tasks[:10], first_only=False)
+        assert found[0] == (rank, codes)
+        assert count == 10
+    finally:
+        os.remove(job_path)
+
+
+def test_compact_results():
+    """Test function
+    With rebuild=False every path of a pooled sweep gives a spine and packed edge types
+    """
+    k_7 = GraphManager.create_complete_graph_edge_set(7)
+    leafy = k_7 + [(7, 8)]
+    wheel = [(1, 2), (1, 3), (1, 4), (1, 5), (2, 3), (3, 4), (4, 5), (2, 5), (5, 6)]
+    pool = GraphManager.create_search_pool(1)
+    try:
+        # by reduction and by the sweep over every spine
+        results = [("torus", leafy, GraphManager.find_torus_embedding_threaded(leafy, vertices=8, pool=pool, rebuild=False)),
+                   ("torus", k_7, GraphManager.find_torus_embedding_threaded(k_7, vertices=7, pool=pool, rebuild=False)),
+                   ("mobius", wheel, GraphManager.find_mobius_embedding(wheel, vertices=6, pool=pool, rebuild=False))]
+        for surface, edgeSet, result in results:
+            assert isinstance(result, tuple)
+            perm, codes = result
+            assert GraphManager.unpack_embedding(surface, perm, edgeSet, codes).is_graph_placed()
+    finally:
+        pool.terminate()
+
+def test_checkpoint_resume(tmp_path):
+    """Test function
+    Sweeps save finished spine ranges and the embedding found, and resume from them
+    """
+    checkpoint = str(tmp_path / "sweep.json")
+    state = {"done": [[0, 3], [5, 6]]}
+    assert [position for position, task in GraphManager.generate_unfinished(range(8), state)] == [3, 4, 6, 7]
+    state = GraphManager.load_checkpoint(checkpoint, "sweep")
+    GraphManager.mark_finished(state, [3, 4, 7])
+    GraphManager.mark_finished(state, [0, 1, 2])
+    assert state["done"] == [[0, 5], [7, 8]]
+    assert GraphManager.count_finished(state) == 6
+
+    k_7 = GraphManager.create_complete_graph_edge_set(7)
+    perms = list(Permutations.DihedralPerms(7))[:20]
+    graph = GraphManager.find_torus_embedding(k_7, perms=perms, checkpoint=checkpoint)
+    assert graph != -1
+    key = GraphManager.get_checkpoint_key("torus", k_7, perms)
+    with open(checkpoint) as infile:
+        saved = json.load(infile)[key]
+    position = perms.index(graph.top_spine)
+    assert saved["found"]["perm"] == graph.top_spine
+    assert saved["done"] == ([[0, position]] if position > 0 else [])
+    state = GraphManager.load_checkpoint(checkpoint, key, resume=True)
+    assert state["found"]["perm"] == graph.top_spine
+    graph = GraphManager.find_torus_embedding(k_7, perms=perms, checkpoint=checkpoint, resume=True)
+    assert graph.is_graph_placed()
+
+    # every spine already searched
+    state["found"] = None
+    state["done"] = [[0, len(perms)]]
+    GraphManager.save_checkpoint(state)
+    assert GraphManager.find_torus_embedding(k_7, perms=perms, checkpoint=checkpoint, resume=True) == -1
+    assert GraphManager.find_torus_embedding(k_7, perms=perms, checkpoint=checkpoint) != -1
+
+    # another list of as many spines has its own entry
+    other_perms = list(Permutations.DihedralPerms(7))[20:40]
+    assert GraphManager.get_checkpoint_key("torus", k_7, other_perms) != key
+    graph = GraphManager.find_torus_embedding(k_7, perms=other_perms, checkpoint=checkpoint, resume=True)
+    assert graph != -1 and graph.top_spine in other_perms
+
+def test_generate_embeddings():
+    """Test function
+    Every placement on a spine is generated once, and unique skips symmetric spines
+    """
+    edgeSet = [(1, 3), (2, 4), (2, 5), (3, 5)]
+    graph = KleinGraph([1, 2, 3, 4, 5], edgeSet.copy())
+    graph.place_free_edges()
+    placements = [sorted(placed.addedEdges) for placed in GraphManager.generate_placements(graph)]
+    assert len(placements) > 1
+    assert all(placements.count(placement) == 1 for placement in placements)
+    assert graph.remainingEdges == edgeSet
+
+    expected = 0
+    for types in itertools.product(graph.edge_types, repeat=len(edgeSet)):
+        copy = graph.copy()
+        for edge, edge_type in zip(edgeSet, types):
+            if not copy.is_edge_available((edge, edge_type)):
+                break
+            copy.place_edge(edge[0], edge[1], edge_type)
+        else:
+            expected += 1
+    assert len(placements) == expected
+
+    wheel = [(1, 2), (1, 3), (1, 4), (1, 5), (2, 3), (3, 4), (4, 5), (2, 5)]
+    embeddings = GraphManager.generate_embeddings(wheel, "mobius", 5)
+    assert next(embeddings).is_graph_placed()
+    assert sum(1 for graph in GraphManager.generate_embeddings(wheel, "mobius", 5, unique=True)) < \
+           1 + sum(1 for graph in embeddings)
+    assert list(GraphManager.generate_embeddings(GraphManager.create_complete_graph_edge_set(8), "torus", 8)) == []
+
+def test_count_embeddings():
+    """Test function
+    Counting gives what generating every embedding gives
+    """
+    wheel = [(1, 2), (1, 3), (1, 4), (1, 5), (2, 3), (3, 4), (4, 5), (2, 5)]
+    graph = MobiusGraph([1, 3, 2, 4, 5], wheel.copy())
+    graph.place_free_edges()
+    remaining = graph.remainingEdges.copy()
+    memo = {}
+    assert GraphManager.count_placements(graph, memo=memo) == sum(1 for placed in GraphManager.generate_placements(graph))
+    assert len(memo) > 0
+    assert graph.remainingEdges == remaining
+
+    pool = GraphManager.create_search_pool(1)
+    try:
+        placements = GraphManager.count_embeddings(wheel, "mobius", 5, placements=True, pool=pool)
+        assert placements == sum(1 for graph in GraphManager.generate_embeddings(wheel, "mobius", 5))
+        spines = GraphManager.count_embeddings(wheel, "mobius", 5, pool=pool)
+        assert spines == sum(1 for perm in Permutations.DihedralPerms(5)
+                             if GraphManager.find_mobius_embedding_with_permutation(perm, wheel) != -1)
+        assert 0 < spines < placements
+        assert GraphManager.count_embeddings(GraphManager.create_complete_graph_edge_set(8), "torus", 8, pool=pool) == 0
+    finally:
+        pool.terminate()
+
+def test_find_embeddings_batch():
+    """Test function
+    A batch gives each edge set what its own sweep gives
+    """
+    k_7 = GraphManager.create_complete_graph_edge_set(7)
+    wheel = [(1, 2), (1, 3), (1, 4), (1, 5), (1, 6), (1, 7), (2, 3), (3, 4), (4, 5), (5, 6), (6, 7), (2, 7)]
+    edgeSets = [k_7, wheel, k_7[:-1], k_7 + [(1, 8)]]
+    perms = list(Permutations.DihedralPerms(7))[:30]
+
+    found = GraphManager.find_batch_with_permutation([1, 2, 3, 4, 5, 6, 7], edgeSets[:3], [0, 2], "torus")
+    assert sorted(found) == [0, 2]
+    graph = GraphManager.unpack_embedding("torus", [1, 2, 3, 4, 5, 6, 7], k_7, found[0])
+    assert graph.is_graph_placed()
+
+    # each spine is handed out with the edge sets unresolved at the time
+    unresolved = {0, 1, 2}
+    tasks = GraphManager.generate_batch_tasks(range(3), unresolved)
+    first, second = next(tasks), next(tasks)
+    assert first == (0, (0, 1, 2)) and first[1] is second[1]
+    unresolved.discard(1)
+    assert next(tasks) == (2, (0, 2))
+
+    pool = GraphManager.create_search_pool(1)
+    try:
+        results = GraphManager.find_embeddings_batch(edgeSets[:3], "mobius", 7, perms=perms, pool=pool)
+        for edgeSet, graph in zip(edgeSets, results):
+            assert (graph == -1) == (GraphManager.find_mobius_embedding(edgeSet, perms=perms, pool=pool) == -1)
+        assert results[0] == -1
+        assert results[1].is_graph_placed()
+
+        results = GraphManager.find_embeddings_batch(edgeSets, "torus", 7, perms=perms, pool=pool, rebuild=False)
+        assert results[3] == -1
+        perm, codes = results[0]
+        assert GraphManager.unpack_embedding("torus", perm, k_7, codes).is_graph_placed()
+    finally:
+        pool.terminate()
+
+def test_result_cache(tmp_path):
+    """Test function
+    Results are stored by canonical form and found again for relabelled graphs
+    """
+    wheel = [(1, 2), (1, 3), (1, 4), (1, 5), (1, 6), (2, 3), (3, 4), (4, 5), (5, 6), (2, 6), (2, 5)]
+    relabel = {1: 4, 2: 6, 3: 1, 4: 5, 5: 2, 6: 3}
+    relabelled = sorted(tuple(sorted((relabel[edge[0]], relabel[edge[1]]))) for edge in wheel)
+    labelling, edges = ResultCache.get_canonical_labelling(wheel, 6)
+    assert ResultCache.get_canonical_labelling(relabelled, 6)[1] == edges
+    assert sorted(labelling.values()) == [1, 2, 3, 4, 5, 6]
+    k_6 = GraphManager.create_complete_graph_edge_set(6)
+    assert ResultCache.get_canonical_labelling(k_6, 6)[1] == tuple(k_6)
+
+    ResultCache.open_result_cache(str(tmp_path / "results.db"))
+    try:
+        graph = GraphManager.find_klein_b_embedding(wheel, vertices=6)
+        assert graph != -1
+        graph = GraphManager.find_klein_b_embedding(relabelled, vertices=6)
+        assert graph.is_graph_placed()
+        assert sorted(edge[0] for edge in graph.addedEdges) == relabelled
+
+        assert GraphManager.find_torus_embedding(GraphManager.create_complete_graph_edge_set(8), vertices=8) == -1
+        rows = ResultCache.result_cache.execute("SELECT proof FROM results WHERE spine IS NULL").fetchall()
+        assert rows == [("edge bound",)]
+        assert GraphManager.find_book_embedding(relabelled, vertices=6).is_graph_placed()
+        assert GraphManager.find_book_embedding(wheel, vertices=6).numPages == 2
+        assert ResultCache.result_cache.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 3
+
+        # an embedding stored for another spine does not answer a sweep of given perms
+        perms = [perm for perm in Permutations.DihedralPerms(6) if perm != graph.top_spine][:5]
+        found = GraphManager.find_klein_b_embedding(relabelled, perms=perms)
+        assert found == -1 or found.top_spine in perms
+        assert GraphManager.find_klein_b_embedding(relabelled, perms=[graph.top_spine]).top_spine == graph.top_spine
+        # but one stored off the dihedral form answers a sweep over every spine up to symmetry
+        assert graph.top_spine != Permutations.get_dihedral_form(graph.top_spine)
+        dihedral_perms = Permutations.DihedralPerms(6)
+        assert GraphManager.find_klein_b_embedding(relabelled, perms=dihedral_perms).top_spine == graph.top_spine
+        generators = Permutations.get_automorphism_generators(relabelled, 6)
+        orbit_perms = Permutations.OrbitPerms(6, generators)
+        assert GraphManager.find_klein_b_embedding(relabelled, perms=orbit_perms).top_spine == graph.top_spine
+        k_8_perms = list(Permutations.DihedralPerms(8))[:3]
+        assert GraphManager.find_torus_embedding(GraphManager.create_complete_graph_edge_set(8), perms=k_8_perms) == -1
+
+        # a book sweep of given perms does not store its page count as the fewest
+        fan = [(1, 2), (2, 3), (3, 4), (4, 5), (5, 6), (1, 6), (1, 3), (1, 4), (1, 5)]
+        assert GraphManager.find_book_embedding(fan, perms=[[1, 2, 4, 6, 3, 5]]).numPages == 3
+        assert GraphManager.find_book_embedding(fan, vertices=6).numPages == 2
+
+        # a batch stores books under the same page count keys
+        pool = GraphManager.create_search_pool(1)
+        try:
+            assert GraphManager.find_embeddings_batch([k_2_3], "book", 5, numberPages=2, pool=pool)[0] != -1
+        finally:
+            pool.terminate()
+        labelling, edges = ResultCache.get_canonical_labelling(k_2_3, 5)
+        assert GraphManager.look_up_cached_result(k_2_3, "book", 5, labelling, edges).numPages == 2
+    finally:
+        ResultCache.close_result_cache()
+
+"""
+Fourth Set: Testing Spine Orderings from Permutations.py
+"""
+def test_dihedral_perms():
+    """Test function
+    """
+    perms = list(Permutations.generate_dihedral_perms(5))
+    assert len(perms) == Permutations.count_dihedral_perms(5) == 12
+    for perm in perms:
+        assert perm[0] == 1
+        assert perm.index(2) < perm.index(5)
+
+    file_perms = Permutations.remove_dihedral_elements(
+        [Permutations.perm_to_string(list(perm)) for perm in itertools.permutations(range(1, 6))])
+    assert len(file_perms) == len(perms)
+    assert len(Permutations.DihedralPerms(5)) == 12
+
+def test_orbit_perms(capsys):
+    """Test function
+    K_n has one spine up to relabelling, K_4,4 has seven, and sweeps over them show a total
+    """
+    k_6 = GraphManager.create_complete_graph_edge_set(6)
+    generators = Permutations.get_automorphism_generators(k_6, 6)
+    orbit_perms = Permutations.OrbitPerms(6, generators)
+    assert orbit_perms.length == None
+    assert len(orbit_perms) == 1
+    assert len(Permutations.OrbitPerms(6, [])) == Permutations.count_dihedral_perms(6)
+
+    k_4_4 = GraphManager.create_complete_bipartite_graph_edge_set(4, 4)
+    generators = Permutations.get_automorphism_generators(k_4_4, 8)
+    perms = list(Permutations.OrbitPerms(8, generators))
+    assert len(perms) == 7
+    assert len(set(Permutations.rank_dihedral_perm(perm) for perm in perms)) == 7
+
+    # counting keeps the ranks, which later loops unrank in the same order
+    orbit_perms = Permutations.OrbitPerms(8, generators)
+    assert len(orbit_perms) == 7
+    assert list(orbit_perms) == perms
+    assert list(orbit_perms.generate_ranks()) == [Permutations.rank_dihedral_perm(perm) for perm in perms]
+    capsys.readouterr()
+    GraphManager.run_sweep(GraphManager.find_torus_embedding_with_permutation, Permutations.OrbitPerms(8, generators),
+                           "torus", k_4_4, edge_order="input")
+    assert "/ 7" in capsys.readouterr().out